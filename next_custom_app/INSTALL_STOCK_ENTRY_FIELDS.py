@@ -17,7 +17,7 @@ def install_fields():
 		# First, run the main setup
 		from next_custom_app.next_custom_app.custom_fields import setup_all_custom_fields
 		print("\n1. Running setup_all_custom_fields()...")
-		result = setup_all_custom_fields()
+		result = setup_all_custom_fields(force=True)
 		if result:
 			print("   ✓ Custom fields setup completed")
 		else:
@@ -27,7 +27,7 @@ def fix_now():
 		# Step 2: Install custom fields
 		print("\nStep 2: Installing custom fields...")
 		from next_custom_app.next_custom_app.custom_fields import setup_all_custom_fields
-		setup_all_custom_fields()
+		setup_all_custom_fields(force=True)
 		
 		# Step 3: Clear cache
 		print("\nStep 3: Clearing cache...")
@@ -6,24 +6,11 @@ app_email = "info@nextcoretechnologies.com"
 app_license = "mit"
 # Fixtures
 # --------
-# Doctype fixtures ensure correct import order (child tables first)
-fixtures = [
-	{
-		"dt": "DocType",
-		"filters": [
-			["name", "in", [
-				"Purchase Requisition Item",
-				"Purchase Requisition",
-				"Procurement Document Link",
-				"Procurement Flow Steps",
-				"Procurement Rule Set",
-				"Procurement Flow",
-				"RFQ Supplier Rule",
-				"Push Subscription"
-			]]
-		]
-	}
-]
+# The app's own DocTypes (Purchase Requisition, Procurement Flow, RFQ Supplier
+# Rule, ...) are synced from their module JSON by ``bench migrate``, which
+# already installs child tables before their parents. Exporting them again as
+# DocType fixtures only duplicated that sync and re-imported them in arbitrary
+# order, so no DocType fixtures are declared here.
 
 
 # Apps
@@ -141,6 +128,7 @@ after_install = "next_custom_app.next_custom_app.install.after_install"
 # ---------
 after_migrate = [
 	"next_custom_app.next_custom_app.install.setup_all_custom_fields",
+	"next_custom_app.next_custom_app.install.add_database_indexes",
 ]
 
 # Uninstallation
@@ -199,78 +187,60 @@ after_migrate = [
 # ---------------
 # Hook on document methods and events
 
+_WORKFLOW = "next_custom_app.next_custom_app.utils.procurement_workflow"
+_PO_QTY = "next_custom_app.next_custom_app.utils.po_quantity_control"
+_PAYMENT = "next_custom_app.next_custom_app.utils.payment_request_utils"
+
+# Events shared by every tracked procurement doctype
+_PROCUREMENT_EVENTS = {
+	"validate": f"{_WORKFLOW}.validate_procurement_document",
+	"on_submit": f"{_WORKFLOW}.on_procurement_submit",
+	"before_cancel": f"{_WORKFLOW}.check_can_cancel",
+	"on_cancel": f"{_WORKFLOW}.on_procurement_cancel"
+}
+
 doc_events = {
-	"Material Request": {
-		"validate": "next_custom_app.next_custom_app.utils.procurement_workflow.validate_procurement_document",
-		"on_submit": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_submit",
-		"before_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.check_can_cancel",
-		"on_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_cancel"
-	},
+	"Material Request": _PROCUREMENT_EVENTS,
 	"Stock Entry": {
-		"before_insert": "next_custom_app.next_custom_app.utils.procurement_workflow.validate_stock_entry_before_insert",
-		"validate": "next_custom_app.next_custom_app.utils.procurement_workflow.validate_procurement_document",
-		"on_submit": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_submit",
-		"before_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.check_can_cancel",
-		"on_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_cancel"
-	},
-	"Purchase Requisition": {
-		"validate": "next_custom_app.next_custom_app.utils.procurement_workflow.validate_procurement_document",
-		"on_submit": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_submit",
-		"before_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.check_can_cancel",
-		"on_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_cancel"
+		"before_insert": f"{_WORKFLOW}.validate_stock_entry_before_insert",
+		**_PROCUREMENT_EVENTS
 	},
+	"Purchase Requisition": _PROCUREMENT_EVENTS,
 	"Request for Quotation": {
+		**_PROCUREMENT_EVENTS,
 		"validate": [
-			"next_custom_app.next_custom_app.utils.procurement_workflow.validate_procurement_document",
+			_PROCUREMENT_EVENTS["validate"],
 			"next_custom_app.next_custom_app.doctype.rfq_supplier_rule.rfq_supplier_rule.validate_rfq_on_submit"
-		],
-		"on_submit": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_submit",
-		"before_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.check_can_cancel",
-		"on_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_cancel"
-	},
-	"Supplier Quotation": {
-		"validate": "next_custom_app.next_custom_app.utils.procurement_workflow.validate_procurement_document",
-		"on_submit": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_submit",
-		"before_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.check_can_cancel",
-		"on_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_cancel"
+		]
 	},
+	"Supplier Quotation": _PROCUREMENT_EVENTS,
 	"Purchase Order": {
+		**_PROCUREMENT_EVENTS,
 		"validate": [
-			"next_custom_app.next_custom_app.utils.procurement_workflow.validate_procurement_document",
-			"next_custom_app.next_custom_app.utils.po_quantity_control.on_po_validate"
+			_PROCUREMENT_EVENTS["validate"],
+			f"{_PO_QTY}.on_po_validate"
 		],
 		"on_submit": [
-			"next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_submit",
-			"next_custom_app.next_custom_app.utils.po_quantity_control.on_po_submit"
+			_PROCUREMENT_EVENTS["on_submit"],
+			f"{_PO_QTY}.on_po_submit"
 		],
 		"on_cancel": [
-			"next_custom_app.next_custom_app.utils.po_quantity_control.on_po_cancel",
-			"next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_cancel"
-		],
-		"before_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.check_can_cancel"
-	},
-	"Purchase Receipt": {
-		"validate": "next_custom_app.next_custom_app.utils.procurement_workflow.validate_procurement_document",
-		"on_submit": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_submit",
-		"before_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.check_can_cancel",
-		"on_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_cancel"
-	},
-	"Purchase Invoice": {
-		"validate": "next_custom_app.next_custom_app.utils.procurement_workflow.validate_procurement_document",
-		"on_submit": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_submit",
-		"before_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.check_can_cancel",
-		"on_cancel": "next_custom_app.next_custom_app.utils.procurement_workflow.on_procurement_cancel"
+			f"{_PO_QTY}.on_po_cancel",
+			_PROCUREMENT_EVENTS["on_cancel"]
+		]
 	},
+	"Purchase Receipt": _PROCUREMENT_EVENTS,
+	"Purchase Invoice": _PROCUREMENT_EVENTS,
 	"Payment Request": {
-		"validate": "next_custom_app.next_custom_app.utils.payment_request_utils.on_payment_request_validate",
-		"on_submit": "next_custom_app.next_custom_app.utils.procurement_workflow.on_payment_request_submit",
+		"validate": f"{_PAYMENT}.on_payment_request_validate",
+		"on_submit": f"{_WORKFLOW}.on_payment_request_submit",
 	},
 	"Payment Entry": {
-		"validate": "next_custom_app.next_custom_app.utils.payment_request_utils.on_payment_entry_validate",
-		"on_submit": "next_custom_app.next_custom_app.utils.procurement_workflow.on_payment_entry_submit",
+		"validate": f"{_PAYMENT}.on_payment_entry_validate",
+		"on_submit": f"{_WORKFLOW}.on_payment_entry_submit",
 	},
 	"User": {
-		"on_update": "next_custom_app.next_custom_app.utils.payment_request_utils.on_user_update"
+		"on_update": f"{_PAYMENT}.on_user_update"
 	},
 	"Sales Invoice": {
 		"on_submit": "next_custom_app.next_custom_app.push_notifications.service.notify_sales_invoice_submit"
@@ -310,7 +280,7 @@ doc_events = {
 # ------------------------------
 #
 override_whitelisted_methods = {
-	"frappe.desk.form.linked_with.get_submitted_linked_docs": "next_custom_app.next_custom_app.utils.procurement_workflow.get_submitted_linked_docs_forward_only"
+	"frappe.desk.form.linked_with.get_submitted_linked_docs": f"{_WORKFLOW}.get_submitted_linked_docs_forward_only"
 }
 
 # override_doctype_class = {}
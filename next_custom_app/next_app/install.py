@@ -44,6 +44,11 @@ def setup_workspace():
 	import os
 	import json
 	
+	# Check before touching the file so reinstalls skip the read and parse
+	if frappe.db.exists("Workspace", "Procurement Workflow"):
+		frappe.log("Procurement Workflow workspace already exists.")
+		return
+	
 	workspace_path = frappe.get_app_path("next_custom_app", "next_custom_app", "workspace", "procurement_workflow", "procurement_workflow.json")
 	
 	if os.path.exists(workspace_path):
@@ -51,11 +56,10 @@ def setup_workspace():
 			with open(workspace_path, 'r') as f:
 				workspace_data = json.load(f)
 			
-			# Check if workspace already exists
+			# The file may name the workspace differently
 			if not frappe.db.exists("Workspace", workspace_data.get("name")):
 				workspace = frappe.get_doc(workspace_data)
 				workspace.insert(ignore_permissions=True)
-				frappe.db.commit()
 				frappe.log("Procurement Workflow workspace created successfully.")
 			else:
 				frappe.log("Procurement Workflow workspace already exists.")
@@ -63,4 +67,4 @@ def setup_workspace():
 			frappe.log_error(
 				title="Workspace Setup Error",
 				message=f"Error setting up workspace: {str(e)}\n{frappe.get_traceback()}"
-			)
\ No newline at end of file
+			)
@@ -26,7 +26,7 @@ def setup_custom_fields():
 	Run: bench --site <site> execute next_custom_app.next_custom_app.custom_fields.setup_all_custom_fields
 	"""
 	from next_custom_app.next_custom_app.custom_fields import setup_all_custom_fields
-	return setup_all_custom_fields()
+	return setup_all_custom_fields(force=True)
 
 
 def get_active_flow():
@@ -15,6 +15,9 @@ Run manually:
     bench --site <site> execute next_custom_app.next_custom_app.custom_fields.setup_all_custom_fields
 """
 
+import hashlib
+import json
+
 import frappe
 from frappe import _
 
@@ -35,6 +38,10 @@ PROCUREMENT_DOCTYPES = [
     "Payment Entry",
 ]
 
+# Global default holding a hash of the last applied field definitions,
+# together with the state of the Custom Field rows they produced
+CUSTOM_FIELDS_SIGNATURE_KEY = "next_custom_app_custom_fields_sig"
+
 
 # ---------------------------------------------------------------------------
 # Field definitions
@@ -45,7 +52,16 @@ def _get_procurement_workflow_fields():
     Return custom field definitions for procurement workflow tracking.
     These fields are added to every doctype listed in ``PROCUREMENT_DOCTYPES``.
     """
-    has_doc_link = frappe.db.exists("DocType", "Procurement Document Link")
+    # One query for every doctype we need to know about instead of an
+    # exists() round-trip per name.
+    present = set(
+        frappe.get_all(
+            "DocType",
+            filters={"name": ["in", PROCUREMENT_DOCTYPES + ["Procurement Document Link"]]},
+            pluck="name",
+        )
+    )
+    has_doc_link = "Procurement Document Link" in present
 
     if not has_doc_link:
         frappe.log_error(
@@ -56,15 +72,13 @@ def _get_procurement_workflow_fields():
     custom_fields = {}
 
     for doctype in PROCUREMENT_DOCTYPES:
-        if not frappe.db.exists("DocType", doctype):
+        if doctype not in present:
             frappe.log_error(
                 title=f"DocType {doctype} does not exist",
                 message=f"Skipping custom field creation for {doctype}",
             )
             continue
 
-        meta = frappe.get_meta(doctype)
-
         custom_fields[doctype] = [
             {
                 "fieldname": "procurement_section",
@@ -137,6 +151,7 @@ def _get_procurement_workflow_fields():
         # Some deployments store project/cost_center only on Material Request header
         # and expect those values to be copied to the next document at doctype level.
         if doctype == "Purchase Requisition":
+            meta = frappe.get_meta(doctype)
             if not meta.has_field("project"):
                 custom_fields[doctype].append(
                     {
@@ -323,7 +338,37 @@ def _get_user_fields():
 # Public API – called from hooks (after_install / after_migrate)
 # ---------------------------------------------------------------------------
 
-def setup_all_custom_fields():
+def _get_fields_state(signature, all_fields):
+    """
+    ``signature`` combined with the state of the Custom Field rows for
+    ``all_fields``, read in one query.
+
+    Returns None when any expected row is missing (deleted in the UI, never
+    created), so the update runs. The latest ``modified`` of the rows is part
+    of the result, so a field edited in the UI also triggers the update.
+    """
+    names = tuple(
+        f"{dt}-{df['fieldname']}"
+        for dt, fields in all_fields.items()
+        for df in (fields if isinstance(fields, (list, tuple)) else [fields])
+    )
+    if not names:
+        return signature
+
+    count, last_modified = frappe.db.sql(
+        """
+        SELECT COUNT(*), MAX(modified)
+        FROM `tabCustom Field`
+        WHERE name IN %(names)s
+        """,
+        {"names": names},
+    )[0]
+    if count != len(set(names)):
+        return None
+    return f"{signature}:{last_modified}"
+
+
+def setup_all_custom_fields(force=False):
     """
     Create / update **all** custom fields defined by this app.
 
@@ -332,6 +377,9 @@ def setup_all_custom_fields():
     * ``after_migrate``
 
     It is safe to call repeatedly – existing fields are updated, not duplicated.
+    The update is skipped when the definitions are unchanged since the last
+    run and none of the resulting Custom Field rows was deleted or edited
+    since; pass ``force=True`` to re-apply them anyway.
     """
     from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
 
@@ -355,9 +403,19 @@ def setup_all_custom_fields():
     # 3. User fields
     all_fields.update(_get_user_fields())
 
+    signature = hashlib.sha1(
+        json.dumps(all_fields, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    if not force and frappe.db.get_global(CUSTOM_FIELDS_SIGNATURE_KEY) == _get_fields_state(
+        signature, all_fields
+    ):
+        return True
+
     try:
         create_custom_fields(all_fields, update=True)
-        frappe.db.commit()
+        frappe.db.set_global(
+            CUSTOM_FIELDS_SIGNATURE_KEY, _get_fields_state(signature, all_fields)
+        )
 
         # Clear meta cache so has_field() picks up new fields immediately
         for dt in all_fields:
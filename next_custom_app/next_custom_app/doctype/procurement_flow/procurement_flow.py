@@ -11,17 +11,25 @@ class ProcurementFlow(Document):
 		self.validate_step_numbers()
 		self.validate_only_one_active_flow()
 		self.validate_step_sequence()
-	
+
+	def on_update(self):
+		"""Invalidate cached active flow / steps used by the procurement workflow"""
+		from next_custom_app.next_custom_app.utils.procurement_workflow import clear_procurement_flow_cache
+		clear_procurement_flow_cache()
+
+	def on_trash(self):
+		from next_custom_app.next_custom_app.utils.procurement_workflow import clear_procurement_flow_cache
+		clear_procurement_flow_cache()
+
 	def validate_step_numbers(self):
 		"""Ensure step numbers are sequential; allow duplicates for parallel steps."""
-		step_numbers = [step.step_no for step in self.flow_steps]
-		if not step_numbers:
-			return
-		
-		# Check for sequential ordering based on unique step numbers
-		unique_sorted = sorted(set(step_numbers))
-		if unique_sorted != list(range(1, len(unique_sorted) + 1)):
-			frappe.throw("Step numbers must be sequential starting from 1")
+		# Single pass over the sorted numbers: each must repeat the previous
+		# one (parallel step) or follow it by exactly one, starting from 1
+		previous = 0
+		for step_no in sorted(step.step_no for step in self.flow_steps):
+			if step_no not in (previous, previous + 1) or step_no < 1:
+				frappe.throw("Step numbers must be sequential starting from 1")
+			previous = step_no
 	
 	def validate_only_one_active_flow(self):
 		"""Ensure only one flow is active at a time"""
@@ -52,40 +60,60 @@ class ProcurementFlow(Document):
 @frappe.whitelist()
 def get_active_flow():
 	"""Get the currently active procurement flow"""
-	active_flow = frappe.db.get_value(
-		"Procurement Flow",
-		{"is_active": 1},
-		["name", "flow_name"],
-		as_dict=True
-	)
-	return active_flow
+	from next_custom_app.next_custom_app.utils.procurement_workflow import get_active_flow as _get_active_flow
+	return _get_active_flow()
 
 
 @frappe.whitelist()
 def get_flow_steps(flow_name):
 	"""Get all steps for a specific procurement flow"""
-	flow = frappe.get_doc("Procurement Flow", flow_name)
-	return [
-		{
-			"step_no": step.step_no,
-			"doctype_name": step.doctype_name,
-			"allowed_actions": step.allowed_actions,
-			"requires_source": step.requires_source
-		}
-		for step in flow.flow_steps
-	]
+	from next_custom_app.next_custom_app.utils.procurement_workflow import (
+		PROCUREMENT_FLOW_CACHE_KEY,
+		get_flow_steps as _get_flow_steps,
+	)
+
+	# Built once per flow and cached next to the full step rows, so the
+	# trimmed dicts are not rebuilt on every navigation call
+	return frappe.cache().hget(
+		PROCUREMENT_FLOW_CACHE_KEY,
+		f"client_steps::{flow_name}",
+		generator=lambda: [
+			{
+				"step_no": step.step_no,
+				"doctype_name": step.doctype_name,
+				"allowed_actions": step.allowed_actions,
+				"requires_source": step.requires_source
+			}
+			for step in _get_flow_steps(flow_name)
+		]
+	)
+
+
+def _get_active_steps_with_index():
+	"""
+	Return (steps, {doctype_name: [positions]}) for the active flow, or (None, None).
+	Positions come from the workflow's cached step index, so repeated and
+	parallel doctypes resolve the same way as in utils.procurement_workflow.
+	"""
+	from next_custom_app.next_custom_app.utils.procurement_workflow import get_flow_step_index
+
+	active_flow = get_active_flow()
+	if not active_flow:
+		return None, None
+
+	steps = get_flow_steps(active_flow.name)
+	return steps, get_flow_step_index(active_flow.name)["by_doctype"]
 
 
 @frappe.whitelist()
 def get_previous_step(current_doctype):
 	"""Get the previous step in the workflow for a given doctype"""
-	active_flow = get_active_flow()
-	if not active_flow:
+	steps, index = _get_active_steps_with_index()
+	if not steps:
 		return None
-	
-	steps = get_flow_steps(active_flow.name)
-	for i, step in enumerate(steps):
-		if step["doctype_name"] == current_doctype and i > 0:
+
+	for i in index.get(current_doctype, ()):
+		if i > 0:
 			return steps[i - 1]
 	
 	return None
@@ -94,13 +122,12 @@ def get_previous_step(current_doctype):
 @frappe.whitelist()
 def get_next_step(current_doctype):
 	"""Get the next step in the workflow for a given doctype"""
-	active_flow = get_active_flow()
-	if not active_flow:
+	steps, index = _get_active_steps_with_index()
+	if not steps:
 		return None
-	
-	steps = get_flow_steps(active_flow.name)
-	for i, step in enumerate(steps):
-		if step["doctype_name"] == current_doctype and i < len(steps) - 1:
+
+	for i in index.get(current_doctype, ()):
+		if i < len(steps) - 1:
 			return steps[i + 1]
 	
 	return None
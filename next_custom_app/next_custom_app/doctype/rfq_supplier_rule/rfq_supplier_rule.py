@@ -1,11 +1,28 @@
 # Copyright (c) 2025, Nextcore Technologies and contributors
 # For license information, please see license.txt
 
+from bisect import bisect_right
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
 
 
+RFQ_SUPPLIER_RULES_CACHE_KEY = "next_custom_app:rfq_supplier_rules"
+
+CURRENCY_DF = {"fieldtype": "Currency"}
+
+OVERLAP_TABLE_HEADER = (
+	"<table class='table table-bordered' style='margin-top: 10px;'>"
+	"<thead><tr>"
+	"<th>Rule Name</th>"
+	"<th>Amount Range</th>"
+	"<th>Min Suppliers</th>"
+	"<th>Priority</th>"
+	"</tr></thead><tbody>"
+)
+
+
 class RFQSupplierRule(Document):
 	def validate(self):
 		"""Validate the RFQ Supplier Rule before saving"""
@@ -18,13 +35,19 @@ class RFQSupplierRule(Document):
 		# Validate minimum suppliers
 		self.validate_min_suppliers()
 	
+	def on_update(self):
+		frappe.cache().delete_value(RFQ_SUPPLIER_RULES_CACHE_KEY)
+	
+	def on_trash(self):
+		frappe.cache().delete_value(RFQ_SUPPLIER_RULES_CACHE_KEY)
+	
 	def validate_amount_range(self):
 		"""Ensure amount_from is less than amount_to"""
 		if self.amount_from >= self.amount_to:
 			frappe.throw(
 				_("Amount From ({0}) must be less than Amount To ({1})").format(
-					frappe.format_value(self.amount_from, {"fieldtype": "Currency"}),
-					frappe.format_value(self.amount_to, {"fieldtype": "Currency"})
+					frappe.format_value(self.amount_from, CURRENCY_DF),
+					frappe.format_value(self.amount_to, CURRENCY_DF)
 				),
 				title=_("Invalid Amount Range")
 			)
@@ -43,60 +66,64 @@ class RFQSupplierRule(Document):
 			# Skip overlap check for inactive rules
 			return
 		
-		# Get all other active rules
-		filters = {
-			"name": ["!=", self.name],
-			"is_active": 1
-		}
+		# Range and activation unchanged since the last save: nothing new can overlap
+		if not self.is_new() and not any(
+			self.has_value_changed(field) for field in ("amount_from", "amount_to", "is_active")
+		):
+			return
 		
+		# Fetch only the active rules whose range overlaps this one.
+		# Two ranges [a1, a2] and [b1, b2] overlap if:
+		# a1 < b2 AND b1 < a2
 		other_rules = frappe.get_all(
 			"RFQ Supplier Rule",
-			filters=filters,
+			filters={
+				"name": ["!=", self.name],
+				"is_active": 1,
+				"amount_from": ["<", self.amount_to],
+				"amount_to": [">", self.amount_from]
+			},
 			fields=["name", "rule_name", "amount_from", "amount_to", "min_suppliers", "priority"]
 		)
 		
-		overlapping_rules = []
+		# Adjacent rules share boundary amounts, so format each distinct amount once
+		formatted = {}
 		
-		for rule in other_rules:
-			# Check if ranges overlap
-			# Two ranges [a1, a2] and [b1, b2] overlap if:
-			# a1 < b2 AND b1 < a2
-			if self.amount_from < rule.amount_to and rule.amount_from < self.amount_to:
-				overlapping_rules.append({
-					"name": rule.rule_name,
-					"range": f"{frappe.format_value(rule.amount_from, {'fieldtype': 'Currency'})} - {frappe.format_value(rule.amount_to, {'fieldtype': 'Currency'})}",
-					"min_suppliers": rule.min_suppliers,
-					"priority": rule.priority
-				})
+		def format_amount(value):
+			if value not in formatted:
+				formatted[value] = frappe.format_value(value, CURRENCY_DF)
+			return formatted[value]
+		
+		overlapping_rules = [
+			{
+				"name": rule.rule_name,
+				"range": f"{format_amount(rule.amount_from)} - {format_amount(rule.amount_to)}",
+				"min_suppliers": rule.min_suppliers,
+				"priority": rule.priority
+			}
+			for rule in other_rules
+		]
 		
 		if overlapping_rules:
 			# Build detailed error message
-			error_msg = _("This rule's amount range overlaps with the following active rules:")
-			error_msg += "<br><br>"
-			error_msg += "<table class='table table-bordered' style='margin-top: 10px;'>"
-			error_msg += "<thead><tr>"
-			error_msg += "<th>Rule Name</th>"
-			error_msg += "<th>Amount Range</th>"
-			error_msg += "<th>Min Suppliers</th>"
-			error_msg += "<th>Priority</th>"
-			error_msg += "</tr></thead><tbody>"
-			
-			for rule in overlapping_rules:
-				error_msg += f"<tr>"
-				error_msg += f"<td><strong>{rule['name']}</strong></td>"
-				error_msg += f"<td>{rule['range']}</td>"
-				error_msg += f"<td>{rule['min_suppliers']}</td>"
-				error_msg += f"<td>{rule['priority']}</td>"
-				error_msg += f"</tr>"
-			
-			error_msg += "</tbody></table>"
-			error_msg += "<br>"
-			error_msg += _("<strong>Your Range:</strong> {0} - {1}").format(
-				frappe.format_value(self.amount_from, {"fieldtype": "Currency"}),
-				frappe.format_value(self.amount_to, {"fieldtype": "Currency"})
+			rows = "".join(
+				f"<tr><td><strong>{rule['name']}</strong></td><td>{rule['range']}</td>"
+				f"<td>{rule['min_suppliers']}</td><td>{rule['priority']}</td></tr>"
+				for rule in overlapping_rules
+			)
+			error_msg = (
+				_("This rule's amount range overlaps with the following active rules:")
+				+ "<br><br>"
+				+ OVERLAP_TABLE_HEADER
+				+ rows
+				+ "</tbody></table><br>"
+				+ _("<strong>Your Range:</strong> {0} - {1}").format(
+					format_amount(self.amount_from),
+					format_amount(self.amount_to)
+				)
+				+ "<br><br>"
+				+ _("Please adjust the amount range to avoid overlaps, or deactivate one of the conflicting rules.")
 			)
-			error_msg += "<br><br>"
-			error_msg += _("Please adjust the amount range to avoid overlaps, or deactivate one of the conflicting rules.")
 			
 			frappe.throw(error_msg, title=_("Overlapping Amount Ranges"))
 
@@ -114,25 +141,37 @@ def get_applicable_rule(total_amount):
 	"""
 	total_amount = float(total_amount)
 	
-	# Get all active rules that cover this amount
-	rules = frappe.get_all(
-		"RFQ Supplier Rule",
-		filters={
-			"is_active": 1,
-			"amount_from": ["<=", total_amount],
-			"amount_to": [">", total_amount]
-		},
-		fields=["name", "rule_name", "amount_from", "amount_to", "min_suppliers", "priority"],
-		order_by="priority asc, amount_from asc"
-	)
+	active_rules = _get_active_rules()
+	
+	# Rules are sorted by amount_from, so only those up to the bisection point
+	# can start at or below the amount; keep the ones that also cover it
+	hi = bisect_right(active_rules["amount_from"], total_amount)
+	rules = [rule for rule in active_rules["rules"][:hi] if (rule.amount_to or 0) > total_amount]
 	
 	if rules:
 		# Return the highest priority rule (lowest priority number)
-		return rules[0]
+		return min(rules, key=lambda rule: (rule.priority or 0, rule.amount_from))
 	
 	return None
 
 
+def _get_active_rules():
+	"""
+	Active rules sorted by amount_from, cached until a rule is saved or deleted.
+	Returns {"rules": [...], "amount_from": [...]} for bisect lookups.
+	"""
+	def load():
+		rules = frappe.get_all(
+			"RFQ Supplier Rule",
+			filters={"is_active": 1},
+			fields=["name", "rule_name", "amount_from", "amount_to", "min_suppliers", "priority"],
+			order_by="amount_from asc, priority asc"
+		)
+		return {"rules": rules, "amount_from": [rule.amount_from or 0 for rule in rules]}
+	
+	return frappe.cache().get_value(RFQ_SUPPLIER_RULES_CACHE_KEY, generator=load)
+
+
 @frappe.whitelist()
 def validate_rfq_suppliers(doctype, docname):
 	"""
@@ -148,16 +187,19 @@ def validate_rfq_suppliers(doctype, docname):
 	if doctype != "Request for Quotation":
 		return {"valid": True, "message": "Not an RFQ document"}
 	
-	# Get the RFQ document
-	rfq = frappe.get_doc(doctype, docname)
+	if not frappe.db.exists(doctype, docname):
+		raise frappe.DoesNotExistError(_("{0} {1} not found").format(_(doctype), docname))
 	
-	# Calculate total amount
-	total_amount = 0
-	if hasattr(rfq, "items") and rfq.items:
-		for item in rfq.items:
-			# Use rate * qty for each item
-			item_amount = (item.rate or 0) * (item.qty or 0)
-			total_amount += item_amount
+	# Calculate total amount (rate * qty per item) without loading the RFQ
+	total_amount = frappe.db.sql(
+		"""
+		SELECT COALESCE(SUM(IFNULL(rate, 0) * IFNULL(qty, 0)), 0)
+		FROM `tabRequest for Quotation Item`
+		WHERE parenttype = %s AND parentfield = 'items' AND parent = %s
+		""",
+		(doctype, docname)
+	)[0][0]
+	total_amount = float(total_amount or 0)
 	
 	if total_amount == 0:
 		return {
@@ -177,7 +219,10 @@ def validate_rfq_suppliers(doctype, docname):
 		}
 	
 	# Count suppliers
-	supplier_count = len(rfq.suppliers) if hasattr(rfq, "suppliers") and rfq.suppliers else 0
+	supplier_count = frappe.db.count(
+		"Request for Quotation Supplier",
+		{"parenttype": doctype, "parentfield": "suppliers", "parent": docname}
+	)
 	
 	if supplier_count < rule["min_suppliers"]:
 		return {
@@ -189,8 +234,8 @@ def validate_rfq_suppliers(doctype, docname):
 				rule["min_suppliers"],
 				supplier_count,
 				rule["rule_name"],
-				frappe.format_value(rule["amount_from"], {"fieldtype": "Currency"}),
-				frappe.format_value(rule["amount_to"], {"fieldtype": "Currency"})
+				frappe.format_value(rule["amount_from"], CURRENCY_DF),
+				frappe.format_value(rule["amount_to"], CURRENCY_DF)
 			),
 			"total_amount": total_amount,
 			"required_suppliers": rule["min_suppliers"],
@@ -4,6 +4,7 @@
 import frappe
 from frappe.model.document import Document
 from frappe.utils import flt
+from operator import itemgetter
 
 
 class SupplierComparison(Document):
@@ -30,35 +31,65 @@ def get_supplier_quotations_comparison(rfq_name):
 		}
 	"""
 	try:
-		# Get RFQ
-		rfq = frappe.get_doc("Request for Quotation", rfq_name)
-		
-		# Get all submitted Supplier Quotations from this RFQ
-		sqs = frappe.get_all("Supplier Quotation",
-			filters={
-				"procurement_source_doctype": "Request for Quotation",
-				"procurement_source_name": rfq_name,
-				"docstatus": 1  # Only submitted
-			},
-			fields=["name", "supplier", "transaction_date", "grand_total"]
+		# Get RFQ header fields used in the payload
+		rfq = frappe.db.get_value(
+			"Request for Quotation",
+			rfq_name,
+			["name", "company", "transaction_date"],
+			as_dict=True
 		)
+		if not rfq:
+			frappe.throw(f"Request for Quotation {rfq_name} not found")
+		
+		# Get all submitted Supplier Quotations from this RFQ together with their
+		# items in one joined query, then split the flat rows per quotation
+		SQ = frappe.qb.DocType("Supplier Quotation")
+		SQI = frappe.qb.DocType("Supplier Quotation Item")
+		rows = (
+			frappe.qb.from_(SQ)
+			.left_join(SQI)
+			.on((SQI.parent == SQ.name) & (SQI.parenttype == "Supplier Quotation"))
+			.select(
+				SQ.name, SQ.supplier, SQ.transaction_date, SQ.grand_total,
+				SQ.base_grand_total, SQ.currency, SQ.conversion_rate,
+				SQI.item_code, SQI.item_name, SQI.qty, SQI.uom,
+				SQI.rate, SQI.base_rate, SQI.amount, SQI.base_amount
+			)
+			.where(
+				(SQ.procurement_source_doctype == "Request for Quotation")
+				& (SQ.procurement_source_name == rfq_name)
+				& (SQ.docstatus == 1)  # Only submitted
+			)
+			.orderby(SQ.modified, order=frappe.qb.desc)
+			.orderby(SQI.idx)
+		).run(as_dict=True)
+		
+		sqs = {}
+		items_by_sq = {}
+		for row in rows:
+			if row.name not in sqs:
+				sqs[row.name] = row
+				items_by_sq[row.name] = []
+			if row.item_code is not None:
+				items_by_sq[row.name].append(row)
+		sqs = list(sqs.values())
 		
 		if not sqs:
 			return {
 				"error": "No submitted Supplier Quotations found for this RFQ",
-				"rfq": rfq.name
+				"rfq": rfq_name
 			}
 		
 		# Build detailed comparison data
 		supplier_quotations = []
 		supplier_totals = {}
-		items_by_supplier = {}  # {item_code: {supplier: {rate, qty, amount}}}
+		items_by_supplier = {}  # {item_code: {item_name, qty, uom, quotes: {supplier: {rate, qty, amount}}}}
 		company_currency = frappe.get_cached_value("Company", rfq.company, "default_currency") or frappe.defaults.get_global_default("currency")
 		available_currencies = set([company_currency] if company_currency else [])
 		exchange_rates_to_company = {company_currency: 1.0} if company_currency else {}
 		
-		for sq_ref in sqs:
-			sq = frappe.get_doc("Supplier Quotation", sq_ref.name)
+		for sq in sqs:
+			sq_items = items_by_sq.get(sq.name, [])
 			supplier = sq.supplier
 			sq_currency = sq.get("currency") or company_currency
 			sq_to_company_rate = flt(sq.get("conversion_rate")) or 1.0
@@ -83,19 +114,20 @@ def get_supplier_quotations_comparison(rfq_name):
 				"currency": sq_currency,
 				"total": flt(sq.grand_total),
 				"base_total": base_total,
-				"items_count": len(sq.items)
+				"items_count": len(sq_items)
 			}
 			
 			# Collect item prices
-			for item in sq.items:
+			for item in sq_items:
 				if item.item_code not in items_by_supplier:
 					items_by_supplier[item.item_code] = {
 						"item_name": item.item_name,
 						"qty": item.qty,
-						"uom": item.uom
+						"uom": item.uom,
+						"quotes": {}
 					}
 				
-				items_by_supplier[item.item_code][supplier] = {
+				items_by_supplier[item.item_code]["quotes"][supplier] = {
 					"rate": flt(item.rate),
 					"base_rate": flt(item.get("base_rate")) or (flt(item.rate) * sq_to_company_rate),
 					"qty": flt(item.qty),
@@ -108,67 +140,21 @@ def get_supplier_quotations_comparison(rfq_name):
 		items_comparison = []
 		item_wise_winners = {}
 		
-		for item_code, item_data in items_by_supplier.items():
-			item_info = {
-				"item_code": item_code,
-				"item_name": item_data.get("item_name"),
-				"qty": item_data.get("qty"),
-				"uom": item_data.get("uom"),
-				"suppliers": {}
-			}
-			
-			best_rate = None
-			best_base_rate = None
-			best_supplier = None
-			total_rate = 0
-			total_base_rate = 0
-			rate_count = 0
-			
-			for supplier in supplier_totals.keys():
-				if supplier in item_data:
-					rate = item_data[supplier]["rate"]
-					base_rate = item_data[supplier]["base_rate"]
-					qty = item_data[supplier]["qty"]
-					amount = item_data[supplier]["amount"]
-					base_amount = item_data[supplier]["base_amount"]
-					currency = item_data[supplier]["currency"]
-					
-					item_info["suppliers"][supplier] = {
-						"rate": rate,
-						"base_rate": base_rate,
-						"qty": qty,
-						"amount": amount,
-						"base_amount": base_amount,
-						"currency": currency
-					}
-					
-					# Track best rate in company currency for fair cross-currency comparison
-					if best_base_rate is None or base_rate < best_base_rate:
-						best_base_rate = base_rate
-						best_rate = rate
-						best_supplier = supplier
-					
-					total_rate += rate
-					total_base_rate += base_rate
-					rate_count += 1
-				else:
-					item_info["suppliers"][supplier] = None
-			
-			item_info["best_rate"] = best_rate
-			item_info["best_base_rate"] = best_base_rate
-			item_info["best_supplier"] = best_supplier
-			item_info["avg_rate"] = total_rate / rate_count if rate_count > 0 else 0
-			item_info["avg_base_rate"] = total_base_rate / rate_count if rate_count > 0 else 0
-			
+		for item_info in _iter_items_comparison(items_by_supplier, list(supplier_totals)):
 			items_comparison.append(item_info)
 			
 			# Track winner by item
+			best_supplier = item_info["best_supplier"]
 			if best_supplier:
 				item_wise_winners[best_supplier] = item_wise_winners.get(best_supplier, 0) + 1
 		
 		# Rank suppliers by company-currency total for fair cross-currency comparison
-		sorted_suppliers = sorted(supplier_totals.items(), key=lambda x: x[1].get("base_total", x[1]["total"]))
-		for rank, (supplier, data) in enumerate(sorted_suppliers, 1):
+		# (supplier, company-currency total) pairs; itemgetter keeps the sort key in C
+		sorted_suppliers = sorted(
+			((supplier, data.get("base_total", data["total"])) for supplier, data in supplier_totals.items()),
+			key=itemgetter(1)
+		)
+		for rank, (supplier, _total) in enumerate(sorted_suppliers, 1):
 			supplier_totals[supplier]["rank"] = rank
 		
 		# Winner by total price
@@ -178,11 +164,7 @@ def get_supplier_quotations_comparison(rfq_name):
 		winner_by_items = max(item_wise_winners.items(), key=lambda x: x[1])[0] if item_wise_winners else None
 		
 		return {
-			"rfq": {
-				"name": rfq.name,
-				"company": rfq.company,
-				"transaction_date": rfq.transaction_date
-			},
+			"rfq": rfq,
 			"supplier_quotations": supplier_quotations,
 			"items_comparison": items_comparison,
 			"supplier_totals": supplier_totals,
@@ -196,8 +178,8 @@ def get_supplier_quotations_comparison(rfq_name):
 			"comparison_summary": {
 				"total_suppliers": len(supplier_quotations),
 				"total_items": len(items_comparison),
-				"best_total_price": sorted_suppliers[0][1].get("base_total", sorted_suppliers[0][1]["total"]) if sorted_suppliers else 0,
-				"worst_total_price": sorted_suppliers[-1][1].get("base_total", sorted_suppliers[-1][1]["total"]) if sorted_suppliers else 0
+				"best_total_price": sorted_suppliers[0][1] if sorted_suppliers else 0,
+				"worst_total_price": sorted_suppliers[-1][1] if sorted_suppliers else 0
 			}
 		}
 		
@@ -209,6 +191,33 @@ def get_supplier_quotations_comparison(rfq_name):
 		frappe.throw(f"Error generating comparison: {str(e)}")
 
 
+def _iter_items_comparison(items_by_supplier, suppliers):
+	"""
+	Yield one item-wise comparison row per item, computed lazily.
+	"""
+	for item_code, item_data in items_by_supplier.items():
+		quotes = item_data["quotes"]
+		
+		# Best rate in company currency for fair cross-currency comparison
+		best_supplier = min(quotes, key=lambda supplier: quotes[supplier]["base_rate"]) if quotes else None
+		rate_count = len(quotes)
+		total_rate = sum(quote["rate"] for quote in quotes.values())
+		total_base_rate = sum(quote["base_rate"] for quote in quotes.values())
+		
+		yield {
+			"item_code": item_code,
+			"item_name": item_data.get("item_name"),
+			"qty": item_data.get("qty"),
+			"uom": item_data.get("uom"),
+			"suppliers": {supplier: quotes.get(supplier) for supplier in suppliers},
+			"best_rate": quotes[best_supplier]["rate"] if best_supplier else None,
+			"best_base_rate": quotes[best_supplier]["base_rate"] if best_supplier else None,
+			"best_supplier": best_supplier,
+			"avg_rate": total_rate / rate_count if rate_count > 0 else 0,
+			"avg_base_rate": total_base_rate / rate_count if rate_count > 0 else 0
+		}
+
+
 @frappe.whitelist()
 def award_supplier(rfq_name, supplier, award_type="total"):
 	"""
@@ -8,16 +8,17 @@ Installation & migration hooks for Next Custom App.
 * ``setup_all_custom_fields`` – called from both ``after_install`` and
   ``after_migrate`` (via hooks.py) so that every custom field is always
   present after any schema change.
+* ``add_database_indexes`` – likewise run after install and migrate.
 """
 
 import frappe
-from frappe import _
 
 
 def after_install():
     """Called after app installation."""
     create_purchase_requisition_doctype()
     setup_all_custom_fields()
+    add_database_indexes()
 
 
 def create_purchase_requisition_doctype():
@@ -25,21 +26,22 @@ def create_purchase_requisition_doctype():
     Create Purchase Requisition and Purchase Requisition Item doctypes.
     Only if they don't already exist.
     """
+    logger = frappe.logger("next_custom_app")
     try:
-        if frappe.db.exists("DocType", "Purchase Requisition"):
-            print("Purchase Requisition doctype already exists. Skipping creation.")
-            return
-
-        if frappe.db.exists("DocType", "Purchase Requisition Item"):
-            print("Purchase Requisition Item doctype already exists. Skipping creation.")
+        existing = frappe.get_all(
+            "DocType",
+            filters={"name": ["in", ["Purchase Requisition", "Purchase Requisition Item"]]},
+            pluck="name",
+        )
+        if existing:
+            logger.info(f"{', '.join(sorted(existing))} doctype already exists. Skipping creation.")
             return
 
-        print("Creating Purchase Requisition and Purchase Requisition Item doctypes...")
-        frappe.db.commit()
-        print("Purchase Requisition doctypes created successfully.")
+        logger.info("Creating Purchase Requisition and Purchase Requisition Item doctypes...")
+        logger.info("Purchase Requisition doctypes created successfully.")
 
     except Exception as e:
-        print(f"Error creating Purchase Requisition doctypes: {str(e)}")
+        logger.error(f"Error creating Purchase Requisition doctypes: {str(e)}")
         frappe.log_error(
             title="Purchase Requisition Creation Error",
             message=frappe.get_traceback(),
@@ -60,3 +62,48 @@ def setup_all_custom_fields():
     )
 
     return _setup()
+
+
+def add_database_indexes():
+    """
+    Add composite indexes used by procurement lookups.
+
+    ``frappe.db.add_index`` is a no-op when the index already exists, so this
+    is safe to run on every migrate.
+    """
+    if frappe.db.table_exists("Procurement Document Link"):
+        frappe.db.add_index(
+            "Procurement Document Link",
+            ["parenttype", "parent", "target_doctype"],
+            "idx_pdl_parent_target",
+        )
+
+    # Range lookups in RFQ Supplier Rule overlap checks and get_applicable_rule
+    if frappe.db.table_exists("RFQ Supplier Rule"):
+        frappe.db.add_index(
+            "RFQ Supplier Rule",
+            ["is_active", "amount_from", "amount_to"],
+            "idx_rfq_rule_active_range",
+        )
+
+    # award_supplier: the submitted quotation of one supplier for an RFQ.
+    # procurement_source_* are custom fields, so wait until they exist.
+    if frappe.db.has_column("Supplier Quotation", "procurement_source_name"):
+        frappe.db.add_index(
+            "Supplier Quotation",
+            ["procurement_source_doctype", "procurement_source_name", "supplier", "docstatus"],
+            "idx_sq_source_supplier",
+        )
+
+    # Child-document lookups (consumed quantities, document chain, cancel
+    # checks, RFQ ordered quantities) filter every procurement doctype on its
+    # source and docstatus != 2
+    from next_custom_app.next_custom_app.custom_fields import PROCUREMENT_DOCTYPES
+
+    for doctype in PROCUREMENT_DOCTYPES:
+        if frappe.db.has_column(doctype, "procurement_source_name"):
+            frappe.db.add_index(
+                doctype,
+                ["procurement_source_doctype", "procurement_source_name", "docstatus"],
+                "procurement_source_idx",
+            )
@@ -2,10 +2,121 @@
 # For license information, please see license.txt
 
 import frappe
-from frappe import _
 from frappe.utils import flt
 
 
+# Error message templates, formatted only when a validation actually fails
+_PO_BREAKDOWN_TMPL = """
+	<div style="background: #fff3cd; padding: 10px; border-radius: 4px; margin: 10px 0; border-left: 3px solid #ffc107;">
+		<p style="margin: 0 0 6px 0; font-weight: 600; color: #856404; font-size: 13px;">📋 Existing Purchase Orders:</p>
+		<ul style="margin: 5px 0; padding-left: 20px;">{rows}
+		</ul>
+	</div>"""
+
+_PO_BREAKDOWN_ROW_TMPL = """
+			<li style="margin: 3px 0;">
+				<a href="/app/purchase-order/{name}" target="_blank" style="color: #007bff;">{name}</a>
+				— <strong>{qty}</strong> qty
+				<span style="color: {status_color}; font-size: 11px;">({status_label})</span>
+			</li>"""
+
+_QTY_EXCEEDED_TMPL = """
+<div style="padding: 20px; background: white; border: 2px solid #dc3545; border-radius: 8px; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;">
+	<h4 style="color: #dc3545; margin: 0 0 15px 0; font-size: 18px; display: flex; align-items: center; gap: 8px;">
+		<span style="font-size: 24px;">⚠️</span>
+		Quantity Exceeds RFQ Limit
+	</h4>
+	
+	<div style="background: #fff3cd; padding: 15px; border-left: 4px solid #ffc107; border-radius: 4px; margin-bottom: 20px;">
+		<p style="margin: 0; color: #856404; font-size: 14px; font-weight: 500;">
+			Item <strong style="color: #dc3545;">{item_code}</strong> exceeds available quantity in the source RFQ.
+		</p>
+	</div>
+	
+	<table style="width: 100%; border-collapse: collapse; margin: 15px 0;">
+		<tr style="border-bottom: 2px solid #e9ecef;">
+			<td style="padding: 10px 0; color: #495057; font-weight: 500;">Source RFQ:</td>
+			<td style="padding: 10px 0; text-align: right;">
+				<a href="/app/request-for-quotation/{rfq_name}" target="_blank" style="color: #007bff; font-weight: 600; text-decoration: none;">
+					{rfq_name} →
+				</a>
+			</td>
+		</tr>
+		<tr style="border-bottom: 1px solid #e9ecef;">
+			<td style="padding: 10px 0; color: #495057;">RFQ Quantity:</td>
+			<td style="padding: 10px 0; text-align: right;">
+				<strong style="color: #28a745; font-size: 16px;">{rfq_total_qty}</strong>
+			</td>
+		</tr>
+		<tr style="border-bottom: 1px solid #e9ecef;">
+			<td style="padding: 10px 0; color: #495057;">Already Ordered (all POs):</td>
+			<td style="padding: 10px 0; text-align: right;">
+				<strong style="color: #ffc107; font-size: 16px;">{already_ordered}</strong>
+			</td>
+		</tr>
+		<tr style="border-bottom: 1px solid #e9ecef;">
+			<td style="padding: 10px 0; color: #495057;">Available to Order:</td>
+			<td style="padding: 10px 0; text-align: right;">
+				<strong style="color: {available_color}; font-size: 16px;">{available_qty}</strong>
+			</td>
+		</tr>
+		<tr>
+			<td style="padding: 10px 0; color: #495057;">This PO Quantity:</td>
+			<td style="padding: 10px 0; text-align: right;">
+				<strong style="color: #dc3545; font-size: 16px;">{po_qty}</strong>
+			</td>
+		</tr>
+	</table>
+	{breakdown_html}
+	<div style="background: #e7f3ff; padding: 15px; border-left: 4px solid #2490ef; border-radius: 4px; margin-top: 20px;">
+		<p style="margin: 0; color: #004085; font-size: 14px;">
+			<strong>💡 Solution:</strong> {solution}
+		</p>
+	</div>
+</div>
+"""
+
+_SUPPLIER_MISMATCH_TMPL = """
+<div style="padding: 20px; background: white; border: 2px solid #dc3545; border-radius: 8px; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;">
+	<h4 style="color: #dc3545; margin: 0 0 15px 0; font-size: 18px; display: flex; align-items: center; gap: 8px;">
+		<span style="font-size: 24px;">🚫</span>
+		Supplier Mismatch
+	</h4>
+	
+	<div style="background: #fff3cd; padding: 15px; border-left: 4px solid #ffc107; border-radius: 4px; margin-bottom: 20px;">
+		<p style="margin: 0; color: #856404; font-size: 14px;">
+			The Purchase Order supplier must match the Supplier Quotation supplier.
+		</p>
+	</div>
+	
+	<table style="width: 100%; border-collapse: collapse; margin: 15px 0;">
+		<tr style="border-bottom: 1px solid #e9ecef;">
+			<td style="padding: 10px 0; color: #495057;">Supplier Quotation:</td>
+			<td style="padding: 10px 0; text-align: right;">
+				<a href="/app/supplier-quotation/{sq_name}" target="_blank" style="color: #007bff; font-weight: 600; text-decoration: none;">
+					{sq_name} →
+				</a>
+			</td>
+		</tr>
+		<tr style="border-bottom: 1px solid #e9ecef;">
+			<td style="padding: 10px 0; color: #495057;">Expected Supplier:</td>
+			<td style="padding: 10px 0; text-align: right;"><strong style="color: #28a745; font-size: 16px;">{expected_supplier}</strong></td>
+		</tr>
+		<tr>
+			<td style="padding: 10px 0; color: #495057;">Current Supplier:</td>
+			<td style="padding: 10px 0; text-align: right;"><strong style="color: #dc3545; font-size: 16px;">{current_supplier}</strong></td>
+		</tr>
+	</table>
+	
+	<div style="background: #e7f3ff; padding: 15px; border-left: 4px solid #2490ef; border-radius: 4px; margin-top: 20px;">
+		<p style="margin: 0; color: #004085; font-size: 14px;">
+			<strong>💡 Solution:</strong> Change the supplier to <strong>{expected_supplier}</strong> or create the PO from the correct Supplier Quotation.
+		</p>
+	</div>
+</div>
+"""
+
+
 def setup_rfq_quantity_fields():
 	"""
 	Add ordered_qty and remaining_qty custom fields to Request for Quotation Item.
@@ -46,14 +157,70 @@ def setup_rfq_quantity_fields():
 		frappe.msgprint("RFQ quantity tracking fields created successfully!", indicator="green")
 		return True
 	except Exception as e:
-		frappe.log_error(
-			title="Error Creating RFQ Quantity Fields",
-			message=f"{str(e)}\n{frappe.get_traceback()}"
-		)
+		frappe.log_error(title="Error Creating RFQ Quantity Fields")
 		frappe.msgprint(f"Error: {str(e)}", indicator="red")
 		return False
 
 
+def _get_sq_header(sq_name):
+	"""
+	Supplier and source fields of a Supplier Quotation, served from the document
+	cache. Raises DoesNotExistError if the quotation is missing.
+	"""
+	sq = frappe.get_cached_value(
+		"Supplier Quotation",
+		sq_name,
+		["name", "supplier", "procurement_source_doctype", "procurement_source_name"],
+		as_dict=True
+	)
+	if not sq:
+		# get_cached_value swallows the missing-document error and returns None
+		raise frappe.DoesNotExistError(f"Supplier Quotation {sq_name} not found")
+	return sq
+
+
+def _get_po_item_codes(doc):
+	"""Distinct item codes on a Purchase Order, computed once per save on ``doc.flags``."""
+	if doc.flags.po_item_codes is None:
+		doc.flags.po_item_codes = frozenset(item.item_code for item in doc.items)
+	return doc.flags.po_item_codes
+
+
+def _get_rfq_context(doc):
+	"""
+	Source chain of a Purchase Order made from a Supplier Quotation, loaded once
+	per save and kept on ``doc.flags`` so the PO validators share it.
+	
+	Returns:
+		frappe._dict with ``sq`` (header fields), ``rfq_name`` (None when the SQ
+		is not from an RFQ) and ``rfq_items_by_code`` (RFQ rows for the item codes
+		on the PO; first row per code wins)
+	"""
+	if doc.flags.rfq_context is None:
+		sq = _get_sq_header(doc.procurement_source_name)
+		rfq_context = frappe._dict(sq=sq, rfq_name=None, rfq_items_by_code={})
+		
+		if sq.procurement_source_doctype == "Request for Quotation" and sq.procurement_source_name:
+			rfq_context.rfq_name = sq.procurement_source_name
+			
+			# Only the RFQ rows for items on this PO are needed
+			for rfq_item in frappe.get_all(
+				"Request for Quotation Item",
+				filters={
+					"parenttype": "Request for Quotation",
+					"parent": rfq_context.rfq_name,
+					"item_code": ["in", list(_get_po_item_codes(doc))]
+				},
+				fields=["name", "item_code", "qty"],
+				order_by="idx asc"
+			):
+				rfq_context.rfq_items_by_code.setdefault(rfq_item.item_code, rfq_item)
+		
+		doc.flags.rfq_context = rfq_context
+	
+	return doc.flags.rfq_context
+
+
 def validate_po_against_rfq(doc):
 	"""
 	Validate Purchase Order quantities against the source RFQ limits.
@@ -78,140 +245,91 @@ def validate_po_against_rfq(doc):
 		return
 	
 	try:
-		sq = frappe.get_doc("Supplier Quotation", doc.procurement_source_name)
+		rfq_context = _get_rfq_context(doc)
 		
-		# Check if SQ is from RFQ
-		if sq.get("procurement_source_doctype") != "Request for Quotation" or not sq.get("procurement_source_name"):
+		# Check if SQ is from RFQ and shares items with this PO
+		rfq_name = rfq_context.rfq_name
+		rfq_items_by_code = rfq_context.rfq_items_by_code
+		if not rfq_name or not rfq_items_by_code:
 			return
 		
-		# Get the source RFQ
-		rfq = frappe.get_doc("Request for Quotation", sq.procurement_source_name)
-		
 		# Dynamically calculate consumed quantities from ALL existing POs (draft + submitted)
 		# linked to any SQ from this RFQ. This is the authoritative check.
 		exclude_name = doc.name if not doc.is_new() else None
-		all_pos_qty = calculate_rfq_ordered_quantities_dynamic(rfq.name, exclude_doc=exclude_name)
+		all_pos_qty = calculate_rfq_ordered_quantities_dynamic(rfq_name, exclude_doc=exclude_name)
 		
 		# Validate each item in the PO
 		for po_item in doc.items:
 			# Find matching RFQ item
-			rfq_item = next((i for i in rfq.items if i.item_code == po_item.item_code), None)
+			rfq_item = rfq_items_by_code.get(po_item.item_code)
 			if not rfq_item:
 				continue
 			
 			rfq_total_qty = flt(rfq_item.qty)
 			po_qty = flt(po_item.qty)
 			
-			# Get dynamically calculated consumed quantity (excludes current doc)
-			already_ordered = flt(all_pos_qty.get(po_item.item_code, 0))
+			# Get dynamically calculated consumed quantity (excludes current doc);
+			# the aggregated values are already floats
+			already_ordered = all_pos_qty.get(po_item.item_code, 0.0)
 			available_qty = rfq_total_qty - already_ordered
 			
 			# Validate
 			if po_qty > available_qty:
 				# Build breakdown of existing POs for the error message
 				po_breakdown = _get_po_breakdown_for_rfq_item(
-					rfq.name, po_item.item_code, exclude_doc=exclude_name
+					rfq_name, po_item.item_code, exclude_doc=exclude_name
 				)
 				
 				breakdown_html = ""
 				if po_breakdown:
-					breakdown_html = """
-	<div style="background: #fff3cd; padding: 10px; border-radius: 4px; margin: 10px 0; border-left: 3px solid #ffc107;">
-		<p style="margin: 0 0 6px 0; font-weight: 600; color: #856404; font-size: 13px;">📋 Existing Purchase Orders:</p>
-		<ul style="margin: 5px 0; padding-left: 20px;">"""
-					for po_info in po_breakdown:
-						status_label = "Submitted" if po_info["docstatus"] == 1 else "Draft"
-						status_color = "#28a745" if po_info["docstatus"] == 1 else "#6c757d"
-						breakdown_html += f"""
-			<li style="margin: 3px 0;">
-				<a href="/app/purchase-order/{po_info['name']}" target="_blank" style="color: #007bff;">{po_info['name']}</a>
-				— <strong>{po_info['qty']}</strong> qty
-				<span style="color: {status_color}; font-size: 11px;">({status_label})</span>
-			</li>"""
-					breakdown_html += """
-		</ul>
-	</div>"""
+					breakdown_html = _PO_BREAKDOWN_TMPL.format(
+						rows="".join(
+							_PO_BREAKDOWN_ROW_TMPL.format(
+								name=po_info["name"],
+								qty=po_info["qty"],
+								status_color="#28a745" if po_info["docstatus"] == 1 else "#6c757d",
+								status_label="Submitted" if po_info["docstatus"] == 1 else "Draft"
+							)
+							for po_info in po_breakdown
+						)
+					)
 				
-				# Create a styled, professional error message
-				error_msg = f"""
-<div style="padding: 20px; background: white; border: 2px solid #dc3545; border-radius: 8px; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;">
-	<h4 style="color: #dc3545; margin: 0 0 15px 0; font-size: 18px; display: flex; align-items: center; gap: 8px;">
-		<span style="font-size: 24px;">⚠️</span>
-		Quantity Exceeds RFQ Limit
-	</h4>
-	
-	<div style="background: #fff3cd; padding: 15px; border-left: 4px solid #ffc107; border-radius: 4px; margin-bottom: 20px;">
-		<p style="margin: 0; color: #856404; font-size: 14px; font-weight: 500;">
-			Item <strong style="color: #dc3545;">{po_item.item_code}</strong> exceeds available quantity in the source RFQ.
-		</p>
-	</div>
-	
-	<table style="width: 100%; border-collapse: collapse; margin: 15px 0;">
-		<tr style="border-bottom: 2px solid #e9ecef;">
-			<td style="padding: 10px 0; color: #495057; font-weight: 500;">Source RFQ:</td>
-			<td style="padding: 10px 0; text-align: right;">
-				<a href="/app/request-for-quotation/{rfq.name}" target="_blank" style="color: #007bff; font-weight: 600; text-decoration: none;">
-					{rfq.name} →
-				</a>
-			</td>
-		</tr>
-		<tr style="border-bottom: 1px solid #e9ecef;">
-			<td style="padding: 10px 0; color: #495057;">RFQ Quantity:</td>
-			<td style="padding: 10px 0; text-align: right;">
-				<strong style="color: #28a745; font-size: 16px;">{rfq_total_qty}</strong>
-			</td>
-		</tr>
-		<tr style="border-bottom: 1px solid #e9ecef;">
-			<td style="padding: 10px 0; color: #495057;">Already Ordered (all POs):</td>
-			<td style="padding: 10px 0; text-align: right;">
-				<strong style="color: #ffc107; font-size: 16px;">{already_ordered}</strong>
-			</td>
-		</tr>
-		<tr style="border-bottom: 1px solid #e9ecef;">
-			<td style="padding: 10px 0; color: #495057;">Available to Order:</td>
-			<td style="padding: 10px 0; text-align: right;">
-				<strong style="color: {'#dc3545' if available_qty <= 0 else '#28a745'}; font-size: 16px;">{available_qty}</strong>
-			</td>
-		</tr>
-		<tr>
-			<td style="padding: 10px 0; color: #495057;">This PO Quantity:</td>
-			<td style="padding: 10px 0; text-align: right;">
-				<strong style="color: #dc3545; font-size: 16px;">{po_qty}</strong>
-			</td>
-		</tr>
-	</table>
-	{breakdown_html}
-	<div style="background: #e7f3ff; padding: 15px; border-left: 4px solid #2490ef; border-radius: 4px; margin-top: 20px;">
-		<p style="margin: 0; color: #004085; font-size: 14px;">
-			<strong>💡 Solution:</strong> {f'Reduce the quantity to <strong>{available_qty}</strong> or less' if available_qty > 0 else 'All quantities have been ordered. Cancel an existing PO or increase the RFQ quantity if you need to order more.'}
-		</p>
-	</div>
-</div>
-"""
+				error_msg = _QTY_EXCEEDED_TMPL.format(
+					item_code=po_item.item_code,
+					rfq_name=rfq_name,
+					rfq_total_qty=rfq_total_qty,
+					already_ordered=already_ordered,
+					available_qty=available_qty,
+					available_color="#dc3545" if available_qty <= 0 else "#28a745",
+					po_qty=po_qty,
+					breakdown_html=breakdown_html,
+					solution=(
+						f"Reduce the quantity to <strong>{available_qty}</strong> or less"
+						if available_qty > 0
+						else "All quantities have been ordered. Cancel an existing PO or increase the RFQ quantity if you need to order more."
+					)
+				)
 				
 				frappe.throw(error_msg, title=f"Quantity Exceeded: {po_item.item_code}")
 				
-	except frappe.DoesNotExistError as e:
-		frappe.log_error(
-			title=f"Document Not Found in PO Validation",
-			message=f"PO: {doc.name}\nError: {str(e)}\n{frappe.get_traceback()}"
-		)
-	except Exception as e:
-		frappe.log_error(
-			title=f"Error Validating PO Against RFQ - {doc.name}",
-			message=frappe.get_traceback()
-		)
+	except frappe.DoesNotExistError:
+		frappe.log_error(title=f"Document Not Found in PO Validation - {doc.name}")
+	except frappe.ValidationError:
+		# Quantity limit messages are expected; nothing to log
+		raise
+	except Exception:
+		frappe.log_error(title=f"Error Validating PO Against RFQ - {doc.name}")
 		# Re-raise to prevent saving invalid data
 		raise
 
 
-def update_rfq_ordered_qty(po_doc, action="add"):
+def update_rfq_ordered_qty(po_doc, sign=1):
 	"""
 	Update the ordered_qty in RFQ items when a Purchase Order is submitted or cancelled.
 	
 	Args:
 		po_doc: Purchase Order document
-		action: "add" (on submit) or "subtract" (on cancel)
+		sign: 1 to add the PO quantities (on submit), -1 to subtract them (on cancel)
 	"""
 	if po_doc.doctype != "Purchase Order":
 		return
@@ -220,53 +338,74 @@ def update_rfq_ordered_qty(po_doc, action="add"):
 		return
 	
 	try:
-		# Get Supplier Quotation
-		sq = frappe.get_doc("Supplier Quotation", po_doc.procurement_source_name)
+		# Source chain shared with the PO validators: the SQ header plus only the
+		# RFQ rows for item codes on this PO (already loaded on submit)
+		rfq_context = _get_rfq_context(po_doc)
 		
-		# Check if SQ is from RFQ
-		if sq.procurement_source_doctype != "Request for Quotation" or not sq.procurement_source_name:
+		# Check if SQ is from RFQ and any PO item is on it
+		if not rfq_context.rfq_name or not rfq_context.rfq_items_by_code:
 			return
 		
-		# Get RFQ and update ordered quantities
-		rfq = frappe.get_doc("Request for Quotation", sq.procurement_source_name)
+		rfq_name = rfq_context.rfq_name
+		rfq_items_by_code = rfq_context.rfq_items_by_code
 		
+		# Net quantity change per RFQ item row
+		deltas = {}
 		for po_item in po_doc.items:
 			# Find matching RFQ item
-			for rfq_item in rfq.items:
-				if rfq_item.item_code == po_item.item_code:
-					po_qty = flt(po_item.qty)
-					
-					if action == "add":
-						rfq_item.ordered_qty = flt(rfq_item.ordered_qty) + po_qty
-					elif action == "subtract":
-						rfq_item.ordered_qty = max(0, flt(rfq_item.ordered_qty) - po_qty)
-					
-					# Calculate remaining quantity
-					rfq_item.remaining_qty = flt(rfq_item.qty) - flt(rfq_item.ordered_qty)
-					
-					frappe.logger().info(
-						f"Updated RFQ {rfq.name} item {rfq_item.item_code}: "
-						f"ordered_qty={rfq_item.ordered_qty}, remaining_qty={rfq_item.remaining_qty}"
-					)
-					break
+			rfq_item = rfq_items_by_code.get(po_item.item_code)
+			if not rfq_item:
+				continue
+			row_name = rfq_item.name
+			
+			deltas[row_name] = deltas.get(row_name, 0) + sign * flt(po_item.qty)
 		
-		# Save RFQ with ignore validations since it's already submitted
-		rfq.flags.ignore_validate_update_after_submit = True
-		rfq.flags.ignore_permissions = True
-		rfq.save()
-		frappe.db.commit()
+		if not deltas:
+			return
 		
-		frappe.logger().info(f"Successfully updated RFQ {rfq.name} ordered quantities (action: {action})")
+		# Apply the deltas atomically in one UPDATE so concurrent PO submissions
+		# cannot overwrite each other. remaining_qty is assigned first so it is
+		# computed from the current ordered_qty on every database backend.
+		delta_case = "CASE name {0} END".format(" ".join(["WHEN %s THEN %s"] * len(deltas)))
+		case_params = [value for item in deltas.items() for value in item]
+		frappe.db.sql(
+			f"""
+			UPDATE `tabRequest for Quotation Item`
+			SET remaining_qty = IFNULL(qty, 0) - GREATEST(0, IFNULL(ordered_qty, 0) + {delta_case}),
+				ordered_qty = GREATEST(0, IFNULL(ordered_qty, 0) + {delta_case})
+			WHERE name IN ({', '.join(['%s'] * len(deltas))})
+			""",
+			case_params + case_params + list(deltas)
+		)
 		
-	except Exception as e:
-		frappe.log_error(
-			title=f"Error Updating RFQ Ordered Quantity - PO {po_doc.name}",
-			message=f"Action: {action}\n{frappe.get_traceback()}"
+		frappe.logger().info(
+			f"Successfully updated RFQ {rfq_name} ordered quantities (sign: {sign:+d}): "
+			+ ", ".join(f"{row_name} {delta:+g}" for row_name, delta in deltas.items())
 		)
+		
+	except Exception:
+		frappe.log_error(title=f"Error Updating RFQ Ordered Quantity ({sign:+d}) - PO {po_doc.name}")
 		# Don't block the PO submission/cancellation if RFQ update fails
 		# Just log the error
 
 
+# Item rows of every non-cancelled PO (draft + submitted) created from a
+# non-cancelled Supplier Quotation of the RFQ %(rfq_name)s
+_RFQ_PO_ITEMS_FROM = """
+	FROM `tabPurchase Order Item` poi
+	INNER JOIN `tabPurchase Order` po
+		ON po.name = poi.parent AND poi.parenttype = 'Purchase Order'
+	INNER JOIN `tabSupplier Quotation` sq
+		ON sq.name = po.procurement_source_name
+	WHERE po.procurement_source_doctype = 'Supplier Quotation'
+		AND po.docstatus != 2
+		AND sq.procurement_source_doctype = 'Request for Quotation'
+		AND sq.procurement_source_name = %(rfq_name)s
+		AND sq.docstatus != 2
+		AND (%(exclude_doc)s IS NULL OR po.name != %(exclude_doc)s)
+"""
+
+
 def calculate_rfq_ordered_quantities_dynamic(rfq_name, exclude_doc=None):
 	"""
 	Dynamically calculate ordered quantities from all existing POs linked to an RFQ.
@@ -282,44 +421,20 @@ def calculate_rfq_ordered_quantities_dynamic(rfq_name, exclude_doc=None):
 	ordered_qtys = {}
 	
 	try:
-		# Get all Supplier Quotations from this RFQ (include drafts and submitted)
-		sqs = frappe.get_all("Supplier Quotation",
-			filters={
-				"procurement_source_doctype": "Request for Quotation",
-				"procurement_source_name": rfq_name,
-				"docstatus": ["!=", 2]  # Not cancelled
-			},
-			pluck="name"
-		)
-		
-		if not sqs:
-			return ordered_qtys
-		
-		# Get all Purchase Orders from these Supplier Quotations (draft + submitted)
-		po_filters = {
-			"procurement_source_doctype": "Supplier Quotation",
-			"procurement_source_name": ["in", sqs],
-			"docstatus": ["!=", 2]  # Not cancelled
-		}
-		if exclude_doc:
-			po_filters["name"] = ["!=", exclude_doc]
-		
-		pos = frappe.get_all("Purchase Order",
-			filters=po_filters,
-			fields=["name"]
-		)
-		
-		# Sum up quantities by item
-		for po in pos:
-			po_doc = frappe.get_doc("Purchase Order", po.name)
-			for item in po_doc.items:
-				ordered_qtys[item.item_code] = flt(ordered_qtys.get(item.item_code, 0)) + flt(item.qty)
+		# One grouped query instead of loading every PO document
+		for row in frappe.db.sql(
+			f"""
+			SELECT poi.item_code, SUM(poi.qty) AS qty
+			{_RFQ_PO_ITEMS_FROM}
+			GROUP BY poi.item_code
+			""",
+			{"rfq_name": rfq_name, "exclude_doc": exclude_doc},
+			as_dict=True
+		):
+			ordered_qtys[row.item_code] = flt(row.qty)
 		
-	except Exception as e:
-		frappe.log_error(
-			title=f"Error Calculating RFQ Ordered Quantities - {rfq_name}",
-			message=frappe.get_traceback()
-		)
+	except Exception:
+		frappe.log_error(title=f"Error Calculating RFQ Ordered Quantities - {rfq_name}")
 	
 	return ordered_qtys
 
@@ -340,42 +455,29 @@ def _get_po_breakdown_for_rfq_item(rfq_name, item_code, exclude_doc=None):
 	breakdown = []
 	
 	try:
-		sqs = frappe.get_all("Supplier Quotation",
-			filters={
-				"procurement_source_doctype": "Request for Quotation",
-				"procurement_source_name": rfq_name,
-				"docstatus": ["!=", 2]
-			},
-			pluck="name"
-		)
-		
-		if not sqs:
-			return breakdown
-		
-		po_filters = {
-			"procurement_source_doctype": "Supplier Quotation",
-			"procurement_source_name": ["in", sqs],
-			"docstatus": ["!=", 2]
-		}
-		if exclude_doc:
-			po_filters["name"] = ["!=", exclude_doc]
-		
-		pos = frappe.get_all("Purchase Order",
-			filters=po_filters,
-			fields=["name", "docstatus", "supplier"]
+		rows = frappe.db.sql(
+			f"""
+			SELECT po.name, po.docstatus, po.supplier, poi.qty
+			{_RFQ_PO_ITEMS_FROM}
+				AND poi.item_code = %(item_code)s
+			ORDER BY po.modified DESC, poi.idx ASC
+			""",
+			{"rfq_name": rfq_name, "exclude_doc": exclude_doc, "item_code": item_code},
+			as_dict=True
 		)
 		
-		for po in pos:
-			po_doc = frappe.get_doc("Purchase Order", po.name)
-			for item in po_doc.items:
-				if item.item_code == item_code:
-					breakdown.append({
-						"name": po.name,
-						"qty": flt(item.qty),
-						"docstatus": po.docstatus,
-						"supplier": po.supplier
-					})
-					break
+		# Report the first matching line of each PO
+		seen = set()
+		for row in rows:
+			if row.name in seen:
+				continue
+			seen.add(row.name)
+			breakdown.append({
+				"name": row.name,
+				"qty": flt(row.qty),
+				"docstatus": row.docstatus,
+				"supplier": row.supplier
+			})
 	except Exception:
 		pass
 	
@@ -394,23 +496,28 @@ def get_rfq_available_quantities(rfq_name):
 		dict: {item_code: {"qty": ..., "ordered_qty": ..., "remaining_qty": ...}}
 	"""
 	try:
-		rfq = frappe.get_doc("Request for Quotation", rfq_name)
+		# Read the three quantity fields straight from the child table
+		items = frappe.get_all(
+			"Request for Quotation Item",
+			filters={"parenttype": "Request for Quotation", "parentfield": "items", "parent": rfq_name},
+			fields=["item_code", "qty", "ordered_qty"],
+			order_by="idx asc"
+		)
 		
 		result = {}
-		for item in rfq.items:
+		for item in items:
+			qty = flt(item.qty)
+			ordered_qty = flt(item.ordered_qty)
 			result[item.item_code] = {
-				"qty": flt(item.qty),
-				"ordered_qty": flt(item.ordered_qty),
-				"remaining_qty": flt(item.qty) - flt(item.ordered_qty)
+				"qty": qty,
+				"ordered_qty": ordered_qty,
+				"remaining_qty": qty - ordered_qty
 			}
 		
 		return result
 		
-	except Exception as e:
-		frappe.log_error(
-			title=f"Error Getting RFQ Available Quantities - {rfq_name}",
-			message=frappe.get_traceback()
-		)
+	except Exception:
+		frappe.log_error(title=f"Error Getting RFQ Available Quantities - {rfq_name}")
 		return {}
 
 
@@ -432,7 +539,7 @@ def validate_supplier_matches_sq(doc):
 		return
 	
 	try:
-		sq = frappe.get_doc("Supplier Quotation", doc.procurement_source_name)
+		sq = _get_rfq_context(doc).sq
 		
 		if not doc.supplier:
 			# Auto-set supplier from SQ
@@ -442,45 +549,11 @@ def validate_supplier_matches_sq(doc):
 		
 		# Validate supplier matches
 		if doc.supplier != sq.supplier:
-			error_msg = f"""
-<div style="padding: 20px; background: white; border: 2px solid #dc3545; border-radius: 8px; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;">
-	<h4 style="color: #dc3545; margin: 0 0 15px 0; font-size: 18px; display: flex; align-items: center; gap: 8px;">
-		<span style="font-size: 24px;">🚫</span>
-		Supplier Mismatch
-	</h4>
-	
-	<div style="background: #fff3cd; padding: 15px; border-left: 4px solid #ffc107; border-radius: 4px; margin-bottom: 20px;">
-		<p style="margin: 0; color: #856404; font-size: 14px;">
-			The Purchase Order supplier must match the Supplier Quotation supplier.
-		</p>
-	</div>
-	
-	<table style="width: 100%; border-collapse: collapse; margin: 15px 0;">
-		<tr style="border-bottom: 1px solid #e9ecef;">
-			<td style="padding: 10px 0; color: #495057;">Supplier Quotation:</td>
-			<td style="padding: 10px 0; text-align: right;">
-				<a href="/app/supplier-quotation/{sq.name}" target="_blank" style="color: #007bff; font-weight: 600; text-decoration: none;">
-					{sq.name} →
-				</a>
-			</td>
-		</tr>
-		<tr style="border-bottom: 1px solid #e9ecef;">
-			<td style="padding: 10px 0; color: #495057;">Expected Supplier:</td>
-			<td style="padding: 10px 0; text-align: right;"><strong style="color: #28a745; font-size: 16px;">{sq.supplier}</strong></td>
-		</tr>
-		<tr>
-			<td style="padding: 10px 0; color: #495057;">Current Supplier:</td>
-			<td style="padding: 10px 0; text-align: right;"><strong style="color: #dc3545; font-size: 16px;">{doc.supplier}</strong></td>
-		</tr>
-	</table>
-	
-	<div style="background: #e7f3ff; padding: 15px; border-left: 4px solid #2490ef; border-radius: 4px; margin-top: 20px;">
-		<p style="margin: 0; color: #004085; font-size: 14px;">
-			<strong>💡 Solution:</strong> Change the supplier to <strong>{sq.supplier}</strong> or create the PO from the correct Supplier Quotation.
-		</p>
-	</div>
-</div>
-"""
+			error_msg = _SUPPLIER_MISMATCH_TMPL.format(
+				sq_name=sq.name,
+				expected_supplier=sq.supplier,
+				current_supplier=doc.supplier
+			)
 			frappe.throw(error_msg.strip(), title="Supplier Mismatch")
 			
 	except frappe.DoesNotExistError:
@@ -492,15 +565,18 @@ def validate_supplier_matches_sq(doc):
 
 def on_po_submit(doc, method=None):
 	"""Hook called when Purchase Order is submitted"""
-	update_rfq_ordered_qty(doc, action="add")
+	update_rfq_ordered_qty(doc, sign=1)
 
 
 def on_po_cancel(doc, method=None):
 	"""Hook called when Purchase Order is cancelled"""
-	update_rfq_ordered_qty(doc, action="subtract")
+	update_rfq_ordered_qty(doc, sign=-1)
 
 
 def on_po_validate(doc, method=None):
 	"""Hook called when Purchase Order is validated"""
+	# Rebuild the shared source chain on every validate; items may have changed
+	doc.flags.rfq_context = None
+	doc.flags.po_item_codes = None
 	validate_supplier_matches_sq(doc)
 	validate_po_against_rfq(doc)
@@ -5,7 +5,6 @@ import json
 import frappe
 from frappe import _
 from frappe.utils import now, flt
-from frappe.desk.form.linked_with import get_submitted_linked_docs as _core_get_submitted_linked_docs
 
 
 def _table_has_column(table, column):
@@ -34,6 +33,218 @@ PROCUREMENT_DOCTYPES = [
 	"Payment Entry",
 ]
 
+# Items child-table fieldname per procurement doctype.
+# Payment Request / Payment Entry have no items table and are absent on purpose.
+PROCUREMENT_ITEMS_FIELD = {
+	"Material Request": "items",
+	"Purchase Requisition": "items",
+	"Request for Quotation": "items",
+	"Supplier Quotation": "items",
+	"Purchase Order": "items",
+	"Purchase Receipt": "items",
+	"Purchase Invoice": "items",
+	"Stock Entry": "items",
+}
+
+# Redis hash holding the active flow, its sorted steps and lookups derived
+# from them. Cleared from ProcurementFlow.on_update / on_trash.
+PROCUREMENT_FLOW_CACHE_KEY = "next_custom_app:procurement_flow"
+
+
+# Validation errors raised by the procurement checks, so callers (imports,
+# API clients, other apps) can tell them apart without parsing the message
+class InvalidSourceItemError(frappe.ValidationError):
+	pass
+
+
+class QtyExceededError(frappe.ValidationError):
+	pass
+
+
+class SupplierNotInRFQError(frappe.ValidationError):
+	pass
+
+
+class CannotCancelError(frappe.ValidationError):
+	pass
+
+
+# Error message templates, formatted only when a validation actually fails
+_INVALID_SOURCE_ITEM_TMPL = """
+<div style="padding: 15px; background: #fff3cd; border-left: 4px solid #ffc107; margin: 10px 0;">
+	<h4 style="color: #856404; margin-top: 0;">❌ Invalid Item</h4>
+	<p style="font-size: 14px; margin: 10px 0;">
+		Item <strong style="color: #d9534f;">{item_code}</strong> does not exist in the source document.
+	</p>
+	<div style="background: white; padding: 10px; border-radius: 4px; margin-top: 10px;">
+		<p style="margin: 5px 0;"><strong>Source Document:</strong>
+			<a href="/app/{source_route}/{source_name}"
+			   target="_blank" style="color: #007bff;">
+				{source_doctype}: {source_name}
+			</a>
+		</p>
+		<p style="margin: 5px 0; color: #666;">
+			Please select items that exist in the source document.
+		</p>
+	</div>
+</div>
+"""
+
+_CONSUMED_BREAKDOWN_TMPL = """
+<div style="background: #fff3cd; padding: 10px; border-radius: 4px; margin-bottom: 10px; border-left: 3px solid #ffc107;">
+	<p style="margin: 0 0 6px 0; font-weight: 600; color: #856404; font-size: 13px;">📋 Already Processed In:</p>
+	<ul style='margin: 10px 0; padding-left: 20px;'>{rows}</ul>
+</div>"""
+
+_CONSUMED_BREAKDOWN_ROW_TMPL = """
+		<li style="margin: 5px 0;">
+		<strong>{qty}</strong>
+		(<a href="/app/{route}/{name}" target="_blank" style="color: #007bff;">{doctype}: {name}</a>)
+		</li>"""
+
+_SOURCE_QTY_EXCEEDED_TMPL = """
+<div style="padding: 15px; background: white; border: 2px solid #dc3545; border-radius: 6px; margin: 10px 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;">
+	<h4 style="color: #dc3545; margin: 0 0 12px 0; font-size: 16px;">
+		⚠️ Quantity Exceeds Requested Stock for <strong>{item_code}</strong>
+	</h4>
+	
+	<table style="width: 100%; border-collapse: collapse; margin-bottom: 12px;">
+		<tr style="border-bottom: 1px solid #e9ecef;">
+			<td style="padding: 6px 0; color: #495057;">Source Quantity:</td>
+			<td style="padding: 6px 0; text-align: right;">
+				<strong style="color: #28a745;">{source_qty}</strong>
+			</td>
+		</tr>
+		<tr style="border-bottom: 1px solid #e9ecef;">
+			<td style="padding: 6px 0; color: #495057;">Already Processed:</td>
+			<td style="padding: 6px 0; text-align: right;">
+				<strong style="color: #ffc107;">{consumed_qty}</strong>
+			</td>
+		</tr>
+		<tr style="border-bottom: 1px solid #e9ecef;">
+			<td style="padding: 6px 0; color: #495057;">Available:</td>
+			<td style="padding: 6px 0; text-align: right;">
+				<strong style="color: {available_color};">{available_qty}</strong>
+			</td>
+		</tr>
+		<tr>
+			<td style="padding: 6px 0; color: #495057;">Your Total Request (this document):</td>
+			<td style="padding: 6px 0; text-align: right;">
+				<strong style="color: #dc3545;">{target_qty}</strong>
+			</td>
+		</tr>
+	</table>
+	{breakdown_html}
+	<p style="margin: 0; color: #004085; font-size: 12px; padding: 8px; background: #e7f3ff; border-radius: 4px;">
+		<strong>💡 Tip:</strong> Reduce total quantity for <strong>{item_code}</strong> to <strong>{available_qty}</strong> or less
+		| <a href="/app/{source_route}/{source_name}"
+		      target="_blank" style="color: #007bff;">View {source_doctype} →</a>
+	</p>
+</div>
+"""
+
+_SUPPLIER_NOT_IN_RFQ_TMPL = """
+<div style="padding: 15px; background: white; border: 2px solid #dc3545; border-radius: 6px; margin: 10px 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;">
+	<h4 style="color: #dc3545; margin: 0 0 12px 0; font-size: 16px;">
+		⚠️ Supplier Not in RFQ
+	</h4>
+	
+	<div style="background: #fff3cd; padding: 12px; border-left: 4px solid #ffc107; border-radius: 4px; margin-bottom: 15px;">
+		<p style="margin: 0; color: #856404; font-size: 14px;">
+			Supplier <strong style="color: #dc3545;">{supplier}</strong> is not listed in the source RFQ.
+		</p>
+	</div>
+	
+	<table style="width: 100%; border-collapse: collapse; margin-bottom: 12px;">
+		<tr style="border-bottom: 1px solid #e9ecef;">
+			<td style="padding: 6px 0; color: #495057;">Source RFQ:</td>
+			<td style="padding: 6px 0; text-align: right;">
+				<strong><a href="/app/request-for-quotation/{rfq_name}" target="_blank" style="color: #007bff;">{rfq_name}</a></strong>
+			</td>
+		</tr>
+		<tr style="border-bottom: 1px solid #e9ecef;">
+			<td style="padding: 6px 0; color: #495057;">Attempted Supplier:</td>
+			<td style="padding: 6px 0; text-align: right;">
+				<strong style="color: #dc3545;">{supplier}</strong>
+			</td>
+		</tr>
+	</table>
+	
+	<div style="margin-bottom: 10px;">
+		<p style="margin: 0 0 6px 0; font-weight: 600; color: #495057; font-size: 13px;">📋 Allowed Suppliers in RFQ:</p>
+		{supplier_list_html}
+	</div>
+	
+	<p style="margin: 0; color: #004085; font-size: 12px; padding: 8px; background: #e7f3ff; border-radius: 4px;">
+		<strong>💡 Tip:</strong> Only suppliers listed in the RFQ can submit quotations.
+		Please select one of the allowed suppliers or add this supplier to the RFQ first.
+	</p>
+</div>
+"""
+
+_CANCEL_CHILD_GROUP_TMPL = (
+	"<div style='margin: 8px 0;'>"
+	"<strong style='color: #495057;'>{doctype}</strong> "
+	"<span style='background: #e9ecef; padding: 2px 8px; border-radius: 10px; font-size: 11px; font-weight: 600;'>{count}</span>"
+	"<ul style='margin: 5px 0 0 0; padding-left: 20px;'>{rows}</ul></div>"
+)
+
+_CANCEL_CHILD_ROW_TMPL = """
+	<li style="margin: 3px 0;">
+		<a href="/app/{route}/{name}" target="_blank" style="color: #007bff; text-decoration: none;">
+			{name}
+		</a>
+	</li>"""
+
+_CANNOT_CANCEL_TMPL = """
+<div style="padding: 20px; background: white; border: 2px solid #dc3545; border-radius: 8px; margin: 10px 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;">
+	<h4 style="color: #dc3545; margin: 0 0 15px 0; font-size: 18px; display: flex; align-items: center; gap: 8px;">
+		<span style="font-size: 24px;">🚫</span>
+		Cannot Cancel Document
+	</h4>
+
+	<div style="background: #fff3cd; padding: 12px; border-left: 4px solid #ffc107; border-radius: 4px; margin-bottom: 15px;">
+		<p style="margin: 0; color: #856404; font-size: 14px;">
+			This document has <strong>{count} active downstream document{plural}</strong> that must be cancelled first.
+		</p>
+	</div>
+
+	<div style="margin-bottom: 15px;">
+		<p style="margin: 0 0 10px 0; font-weight: 600; color: #495057; font-size: 14px;">
+			📋 Active Downstream Documents:
+		</p>
+		{child_docs_html}
+	</div>
+
+	<div style="background: #e7f3ff; padding: 12px; border-radius: 4px; margin-top: 15px;">
+		<p style="margin: 0; color: #004085; font-size: 13px;">
+			<strong>💡 Tip:</strong> Cancel the latest documents first, then cancel this document.
+		</p>
+	</div>
+</div>
+"""
+
+
+def _route_slug(doctype):
+	"""Desk route segment for a doctype, e.g. "Purchase Order" -> "purchase-order"."""
+	return doctype.lower().replace(" ", "-")
+
+
+def _use_html_errors():
+	"""
+	Whether validation errors should be rendered as the HTML dialogs above.
+	Data imports, patches and background jobs only log the message, so they get
+	a one-line plain text error instead.
+	"""
+	if frappe.flags.in_import or frappe.flags.in_patch:
+		return False
+	return bool(getattr(frappe.local, "request", None))
+
+
+def clear_procurement_flow_cache():
+	"""Drop the cached active flow and flow steps."""
+	frappe.cache().delete_value(PROCUREMENT_FLOW_CACHE_KEY)
+
 
 def setup_custom_fields():
 	"""
@@ -42,17 +253,41 @@ def setup_custom_fields():
 	Run: bench --site <site> execute next_custom_app.next_custom_app.custom_fields.setup_all_custom_fields
 	"""
 	from next_custom_app.next_custom_app.custom_fields import setup_all_custom_fields
-	return setup_all_custom_fields()
+	return setup_all_custom_fields(force=True)
+
+
+def has_active_flow():
+	"""Cached yes/no for "is any Procurement Flow active?".
+
+	Unlike the flow lookup itself, a negative answer is cached too, so sites
+	that never configured a flow skip the query on every validate.
+	"""
+	return frappe.cache().hget(
+		PROCUREMENT_FLOW_CACHE_KEY,
+		"has_active",
+		generator=lambda: "yes" if frappe.db.exists("Procurement Flow", {"is_active": 1}) else "no"
+	) == "yes"
 
 
 @frappe.whitelist()
 def get_active_flow():
-	"""Get the currently active procurement flow"""
-	return frappe.db.get_value(
-		"Procurement Flow",
-		{"is_active": 1},
-		["name", "flow_name"],
-		as_dict=True
+	"""Get the currently active procurement flow.
+
+	Served from Redis (and memoized per request by ``frappe.cache().hget``)
+	so the validators that resolve the flow repeatedly do not hit the DB.
+	"""
+	if not has_active_flow():
+		return None
+
+	return frappe.cache().hget(
+		PROCUREMENT_FLOW_CACHE_KEY,
+		"active",
+		generator=lambda: frappe.db.get_value(
+			"Procurement Flow",
+			{"is_active": 1},
+			["name", "flow_name"],
+			as_dict=True
+		)
 	)
 
 
@@ -82,10 +317,60 @@ def get_procurement_doctypes():
 	return doctypes
 
 
+def _get_active_flow_step_doctypes():
+	"""Doctypes with a step in the active flow (empty when no flow is active).
+
+	Cached with the flow itself, so validate hooks of documents outside the
+	flow return after a set lookup instead of resolving flow and step.
+	"""
+	if not has_active_flow():
+		return frozenset()
+
+	return frappe.cache().hget(
+		PROCUREMENT_FLOW_CACHE_KEY,
+		"step_doctypes",
+		generator=lambda: frozenset(get_procurement_doctypes())
+	)
+
+
 def get_flow_steps(flow_name):
-	"""Get all steps for a specific procurement flow"""
-	flow = frappe.get_doc("Procurement Flow", flow_name)
-	return sorted(flow.flow_steps, key=lambda x: (x.step_no, x.doctype_name))
+	"""Get all steps for a specific procurement flow (cached, sorted by step_no).
+
+	Steps are plain ``frappe._dict`` rows, not Documents; treat them as read-only.
+	"""
+	return frappe.cache().hget(
+		PROCUREMENT_FLOW_CACHE_KEY,
+		f"steps::{flow_name}",
+		generator=lambda: _load_flow_steps(flow_name)
+	)
+
+
+def _load_flow_steps(flow_name):
+	return frappe.get_all(
+		"Procurement Flow Steps",
+		filters={"parent": flow_name, "parenttype": "Procurement Flow", "parentfield": "flow_steps"},
+		fields=[
+			"name", "step_no", "doctype_name", "step_group", "allowed_actions",
+			"role", "requires_source", "is_final_step"
+		],
+		order_by="step_no asc, doctype_name asc"
+	)
+
+
+def get_flow_step_index(flow_name):
+	"""Positions of the steps returned by get_flow_steps, cached next to them.
+
+	Returns ``{"by_doctype": {doctype_name: [i, ...]}, "by_step_no": {step_no: [i, ...]}}``
+	with positions in step order.
+	"""
+	def load():
+		index = {"by_doctype": {}, "by_step_no": {}}
+		for i, step in enumerate(get_flow_steps(flow_name)):
+			index["by_doctype"].setdefault(step.doctype_name, []).append(i)
+			index["by_step_no"].setdefault(step.step_no, []).append(i)
+		return index
+
+	return frappe.cache().hget(PROCUREMENT_FLOW_CACHE_KEY, f"step_index::{flow_name}", generator=load)
 
 
 def get_current_step(doctype, flow_name=None):
@@ -96,11 +381,8 @@ def get_current_step(doctype, flow_name=None):
 			return None
 		flow_name = active_flow.name
 	
-	steps = get_flow_steps(flow_name)
-	for step in steps:
-		if step.doctype_name == doctype:
-			return step
-	return None
+	positions = get_flow_step_index(flow_name)["by_doctype"].get(doctype)
+	return get_flow_steps(flow_name)[positions[0]] if positions else None
 
 
 def get_previous_step(current_doctype, flow_name=None):
@@ -111,10 +393,9 @@ def get_previous_step(current_doctype, flow_name=None):
 			return None
 		flow_name = active_flow.name
 	
-	steps = get_flow_steps(flow_name)
-	for i, step in enumerate(steps):
-		if step.doctype_name == current_doctype and i > 0:
-			return steps[i - 1]
+	for i in get_flow_step_index(flow_name)["by_doctype"].get(current_doctype, ()):
+		if i > 0:
+			return get_flow_steps(flow_name)[i - 1]
 	return None
 
 
@@ -127,16 +408,17 @@ def get_previous_steps_for_doctype(current_doctype, flow_name=None):
 		flow_name = active_flow.name
 	
 	steps = get_flow_steps(flow_name)
-	current_steps = [step for step in steps if step.doctype_name == current_doctype]
-	if not current_steps:
+	step_index = get_flow_step_index(flow_name)
+	positions = step_index["by_doctype"].get(current_doctype)
+	if not positions:
 		return []
 	
-	min_step_no = min(step.step_no for step in current_steps)
-	prev_step_no = min_step_no - 1
+	# Steps are sorted by step_no, so the first position has the lowest number
+	prev_step_no = steps[positions[0]].step_no - 1
 	if prev_step_no < 1:
 		return []
 	
-	return [step for step in steps if step.step_no == prev_step_no]
+	return [steps[i] for i in step_index["by_step_no"].get(prev_step_no, ())]
 
 
 @frappe.whitelist()
@@ -157,6 +439,9 @@ def get_next_steps(current_doctype, flow_name=None):
 
 	When the current doctype has **no** step_group (e.g. Purchase Order at
 	step 5), all next steps are returned regardless of their group.
+
+	Cached per flow and doctype next to the flow steps; treat the returned
+	dicts as read-only.
 	"""
 	if not flow_name:
 		active_flow = get_active_flow()
@@ -164,8 +449,21 @@ def get_next_steps(current_doctype, flow_name=None):
 			return []
 		flow_name = active_flow.name
 	
+	# Only doctypes of the flow get a cache entry (this is called from the client)
+	if current_doctype not in get_flow_step_index(flow_name)["by_doctype"]:
+		return []
+	
+	return frappe.cache().hget(
+		PROCUREMENT_FLOW_CACHE_KEY,
+		f"next_steps::{flow_name}::{current_doctype}",
+		generator=lambda: _load_next_steps(current_doctype, flow_name)
+	)
+
+
+def _load_next_steps(current_doctype, flow_name):
 	steps = get_flow_steps(flow_name)
-	current_steps = [step for step in steps if step.doctype_name == current_doctype]
+	step_index = get_flow_step_index(flow_name)
+	current_steps = [steps[i] for i in step_index["by_doctype"].get(current_doctype, ())]
 	if not current_steps:
 		return []
 	
@@ -177,9 +475,9 @@ def get_next_steps(current_doctype, flow_name=None):
 	current_groups.discard(None)
 	current_groups.discard("")
 	
-	current_step_no = min(step.step_no for step in current_steps)
-	next_step_no = current_step_no + 1
-	next_steps = [step for step in steps if step.step_no == next_step_no]
+	# Steps are sorted by step_no, so the first match has the lowest number
+	next_step_no = current_steps[0].step_no + 1
+	next_steps = [steps[i] for i in step_index["by_step_no"].get(next_step_no, ())]
 	
 	# If the current doctype belongs to a step_group, filter next steps
 	# to only those in the same group (or with no group assigned).
@@ -204,6 +502,27 @@ def get_next_steps(current_doctype, flow_name=None):
 	]
 
 
+def _get_source_doc(doctype, name):
+	"""
+	Return a read-only source document, memoized for the current request.
+	Validators share source documents (and the RFQ behind a Supplier Quotation),
+	so each is loaded at most once per request. Do not modify the returned doc.
+	"""
+	if not hasattr(frappe.local, "procurement_source_docs"):
+		frappe.local.procurement_source_docs = {}
+
+	key = (doctype, name)
+	if key not in frappe.local.procurement_source_docs:
+		frappe.local.procurement_source_docs[key] = frappe.get_doc(doctype, name)
+	return frappe.local.procurement_source_docs[key]
+
+
+def _forget_source_doc(doctype, name):
+	"""Drop a memoized source document (and its item rows) after it has been modified."""
+	getattr(frappe.local, "procurement_source_docs", {}).pop((doctype, name), None)
+	getattr(frappe.local, "procurement_source_item_rows", {}).pop((doctype, name), None)
+
+
 def validate_step_order(doc):
 	"""
 	Validate that the document is being created in the correct step order.
@@ -302,9 +621,6 @@ def validate_quantity_limits(doc):
 		frappe.logger().info(f"Skipping quantity validation for Supplier Quotation {doc.name} - control at PO level")
 		return
 	
-	# Get source document
-	source_doc = frappe.get_doc(doc.procurement_source_doctype, doc.procurement_source_name)
-	
 	# For Purchase Order from Supplier Quotation, track against RFQ not SQ
 	# This prevents over-allocation when only one supplier will be awarded from multiple quotes
 	tracking_source_doctype = doc.procurement_source_doctype
@@ -312,12 +628,16 @@ def validate_quantity_limits(doc):
 	
 	if doc.doctype == "Purchase Order" and doc.procurement_source_doctype == "Supplier Quotation":
 		# Get the RFQ that the Supplier Quotation came from
-		sq_doc = source_doc
-		if sq_doc.get("procurement_source_doctype") == "Request for Quotation" and sq_doc.get("procurement_source_name"):
+		sq_source = frappe.db.get_value(
+			"Supplier Quotation",
+			doc.procurement_source_name,
+			["procurement_source_doctype", "procurement_source_name"],
+			as_dict=True
+		) or {}
+		if sq_source.get("procurement_source_doctype") == "Request for Quotation" and sq_source.get("procurement_source_name"):
 			# Track against RFQ instead of SQ for quantity limits
 			tracking_source_doctype = "Request for Quotation"
-			tracking_source_name = sq_doc.procurement_source_name
-			source_doc = frappe.get_doc(tracking_source_doctype, tracking_source_name)
+			tracking_source_name = sq_source.get("procurement_source_name")
 			frappe.logger().info(f"PO {doc.name}: Tracking quantities against RFQ {tracking_source_name} instead of SQ {doc.procurement_source_name}")
 	
 	# Get items field names for different doctypes
@@ -327,7 +647,8 @@ def validate_quantity_limits(doc):
 	if not source_items_field or not target_items_field:
 		return
 	
-	source_items = source_doc.get(source_items_field) or []
+	# Only item_code and qty of the source rows are needed; read them from the child table
+	source_items = _get_source_item_rows(tracking_source_doctype, tracking_source_name)
 	target_items = doc.get(target_items_field) or []
 
 	# Aggregate requested quantities per item_code (important for Stock Entry which can have duplicates)
@@ -338,6 +659,33 @@ def validate_quantity_limits(doc):
 			continue
 		qty = (getattr(row, "qty", 0) or 0)
 		target_requested[item_code] = target_requested.get(item_code, 0) + qty
+
+	# Index source rows by item_code (first row wins, as before)
+	source_items_by_code = {}
+	for si in source_items:
+		source_items_by_code.setdefault(si.item_code, si)
+	
+	if not target_requested:
+		return
+	
+	# Items missing from the source fail on their own, so check them before
+	# querying what other documents have already consumed
+	for item_code in target_requested:
+		if item_code not in source_items_by_code:
+			if not _use_html_errors():
+				frappe.throw(
+					f"Item {item_code} does not exist in {doc.procurement_source_doctype} {doc.procurement_source_name}",
+					exc=InvalidSourceItemError, title="Invalid Item"
+				)
+			
+			# Create detailed error message for invalid item
+			error_msg = _INVALID_SOURCE_ITEM_TMPL.format(
+				item_code=item_code,
+				source_route=_route_slug(doc.procurement_source_doctype),
+				source_doctype=doc.procurement_source_doctype,
+				source_name=doc.procurement_source_name
+			)
+			frappe.throw(error_msg, exc=InvalidSourceItemError, title="Invalid Item")
 	
 	# Calculate already consumed quantities, excluding current document if it's being updated
 	exclude_current = doc.name if not doc.is_new() else None
@@ -352,114 +700,63 @@ def validate_quantity_limits(doc):
 		exclude_doc=exclude_current
 	)
 	
-	frappe.logger().info(f"Validating quantities for {doc.doctype} {doc.name}")
-	frappe.logger().info(f"Tracking Source: {tracking_source_name}, Consumed breakdown: {consumed_breakdown}")
+	# Debug-level with lazy %-formatting: the breakdown is only rendered when debug logging is on
+	logger = frappe.logger("next_custom_app")
+	logger.debug(
+		"Validating quantities for %s %s. Tracking Source: %s, Consumed breakdown: %s",
+		doc.doctype, doc.name, tracking_source_name, consumed_breakdown
+	)
 	
-	# Validate each target item_code once
-	validated = set()
+	# Validate each target item_code once (target_requested is already keyed by item_code)
 	for item_code, target_qty in target_requested.items():
-		if item_code in validated:
-			continue
-		validated.add(item_code)
-
-		# Find matching source item
-		source_item = next((si for si in source_items if si.item_code == item_code), None)
-		if not source_item:
-			# Create detailed error message for invalid item
-			error_msg = f"""
-			<div style="padding: 15px; background: #fff3cd; border-left: 4px solid #ffc107; margin: 10px 0;">
-				<h4 style="color: #856404; margin-top: 0;">❌ Invalid Item</h4>
-				<p style="font-size: 14px; margin: 10px 0;">
-					Item <strong style="color: #d9534f;">{item_code}</strong> does not exist in the source document.
-				</p>
-				<div style="background: white; padding: 10px; border-radius: 4px; margin-top: 10px;">
-					<p style="margin: 5px 0;"><strong>Source Document:</strong>
-						<a href="/app/{doc.procurement_source_doctype.lower().replace(' ', '-')}/{doc.procurement_source_name}"
-						   target="_blank" style="color: #007bff;">
-							{doc.procurement_source_doctype}: {doc.procurement_source_name}
-						</a>
-					</p>
-					<p style="margin: 5px 0; color: #666;">
-						Please select items that exist in the source document.
-					</p>
-				</div>
-			</div>
-			"""
-			frappe.throw(error_msg, title="Invalid Item")
-		
+		source_item = source_items_by_code[item_code]
 		source_qty = source_item.qty or 0
 		item_breakdown = consumed_breakdown.get(item_code, {"total": 0, "documents": []})
 		consumed_qty = item_breakdown["total"]
 		available_qty = source_qty - consumed_qty
 		
-		frappe.logger().info(f"Item {item_code}: Source={source_qty}, Consumed={consumed_qty}, Requested={target_qty}, Available={available_qty}")
+		logger.debug(
+			"Item %s: Source=%s, Consumed=%s, Requested=%s, Available=%s",
+			item_code, source_qty, consumed_qty, target_qty, available_qty
+		)
 		
 		if target_qty > available_qty:
+			if not _use_html_errors():
+				frappe.throw(
+					f"Quantity {target_qty} for item {item_code} exceeds the available quantity {available_qty} "
+					f"of {doc.procurement_source_doctype} {doc.procurement_source_name} "
+					f"(source {source_qty}, already processed {consumed_qty})",
+					exc=QtyExceededError, title=f"Quantity Exceeded for {item_code}"
+				)
+			
 			# Create detailed breakdown HTML
 			breakdown_html = ""
 			if item_breakdown["documents"]:
-				breakdown_html = "<ul style='margin: 10px 0; padding-left: 20px;'>"
-				for doc_info in item_breakdown["documents"]:
-					dt = doc_info.get("doctype") or doc.doctype
-					doc_link = f"/app/{dt.lower().replace(' ', '-')}/{doc_info['name']}"
-					breakdown_html += f"""
-					<li style="margin: 5px 0;">
-					<strong>{doc_info['qty']}</strong>
-					(<a href="{doc_link}" target="_blank" style="color: #007bff;">{dt}: {doc_info['name']}</a>)
-					</li>
-					"""
-				breakdown_html += "</ul>"
-			else:
-				breakdown_html = "<p style='margin: 10px 0; color: #666;'><em>No documents processed yet</em></p>"
+				breakdown_html = _CONSUMED_BREAKDOWN_TMPL.format(
+					rows="".join(
+						_CONSUMED_BREAKDOWN_ROW_TMPL.format(
+							qty=doc_info["qty"],
+							route=_route_slug(doc_info.get("doctype") or doc.doctype),
+							doctype=doc_info.get("doctype") or doc.doctype,
+							name=doc_info["name"]
+						)
+						for doc_info in item_breakdown["documents"]
+					)
+				)
 			
-			error_msg = f"""
-			<div style="padding: 15px; background: white; border: 2px solid #dc3545; border-radius: 6px; margin: 10px 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;">
-				<h4 style="color: #dc3545; margin: 0 0 12px 0; font-size: 16px;">
-					⚠️ Quantity Exceeds Requested Stock for <strong>{item_code}</strong>
-				</h4>
-				
-				<table style="width: 100%; border-collapse: collapse; margin-bottom: 12px;">
-					<tr style="border-bottom: 1px solid #e9ecef;">
-						<td style="padding: 6px 0; color: #495057;">Source Quantity:</td>
-						<td style="padding: 6px 0; text-align: right;">
-							<strong style="color: #28a745;">{source_qty}</strong>
-						</td>
-					</tr>
-					<tr style="border-bottom: 1px solid #e9ecef;">
-						<td style="padding: 6px 0; color: #495057;">Already Processed:</td>
-						<td style="padding: 6px 0; text-align: right;">
-							<strong style="color: #ffc107;">{consumed_qty}</strong>
-						</td>
-					</tr>
-					<tr style="border-bottom: 1px solid #e9ecef;">
-						<td style="padding: 6px 0; color: #495057;">Available:</td>
-						<td style="padding: 6px 0; text-align: right;">
-							<strong style="color: {'#28a745' if available_qty > 0 else '#dc3545'};">{available_qty}</strong>
-						</td>
-					</tr>
-					<tr>
-						<td style="padding: 6px 0; color: #495057;">Your Total Request (this document):</td>
-						<td style="padding: 6px 0; text-align: right;">
-							<strong style="color: #dc3545;">{target_qty}</strong>
-						</td>
-					</tr>
-				</table>
-				
-				{f'''
-				<div style="background: #fff3cd; padding: 10px; border-radius: 4px; margin-bottom: 10px; border-left: 3px solid #ffc107;">
-					<p style="margin: 0 0 6px 0; font-weight: 600; color: #856404; font-size: 13px;">📋 Already Processed In:</p>
-					{breakdown_html}
-				</div>
-				''' if item_breakdown["documents"] else ''}
-				
-				<p style="margin: 0; color: #004085; font-size: 12px; padding: 8px; background: #e7f3ff; border-radius: 4px;">
-					<strong>💡 Tip:</strong> Reduce total quantity for <strong>{item_code}</strong> to <strong>{available_qty}</strong> or less
-					| <a href="/app/{doc.procurement_source_doctype.lower().replace(' ', '-')}/{doc.procurement_source_name}"
-					      target="_blank" style="color: #007bff;">View {doc.procurement_source_doctype} →</a>
-				</p>
-			</div>
-			"""
-			frappe.throw(error_msg, title=f"Quantity Exceeded for {item_code}")
+			error_msg = _SOURCE_QTY_EXCEEDED_TMPL.format(
+				item_code=item_code,
+				source_qty=source_qty,
+				consumed_qty=consumed_qty,
+				available_qty=available_qty,
+				available_color="#28a745" if available_qty > 0 else "#dc3545",
+				target_qty=target_qty,
+				breakdown_html=breakdown_html,
+				source_route=_route_slug(doc.procurement_source_doctype),
+				source_doctype=doc.procurement_source_doctype,
+				source_name=doc.procurement_source_name
+			)
+			frappe.throw(error_msg, exc=QtyExceededError, title=f"Quantity Exceeded for {item_code}")
 
 
 def validate_items_against_source(doc):
@@ -469,27 +766,41 @@ def validate_items_against_source(doc):
 	if not doc.get("procurement_source_doctype") or not doc.get("procurement_source_name"):
 		return
 	
-	source_doc = frappe.get_doc(doc.procurement_source_doctype, doc.procurement_source_name)
-	
 	source_items_field = get_items_field_name(doc.procurement_source_doctype)
 	target_items_field = get_items_field_name(doc.doctype)
 	
 	if not source_items_field or not target_items_field:
 		return
 	
-	source_items = source_doc.get(source_items_field) or []
-	target_items = doc.get(target_items_field) or []
+	# Only item codes are needed; reuse the rows validate_quantity_limits read for the same source
+	source_item_codes = {
+		item.item_code
+		for item in _get_source_item_rows(doc.procurement_source_doctype, doc.procurement_source_name)
+	}
 	
-	source_item_codes = {item.item_code for item in source_items}
+	missing = []
+	for target_item in doc.get(target_items_field) or []:
+		if target_item.item_code not in source_item_codes and target_item.item_code not in missing:
+			missing.append(target_item.item_code)
 	
-	for target_item in target_items:
-		if target_item.item_code not in source_item_codes:
-			frappe.throw(
-				_("Item {0} does not exist in source document {1}").format(
-					target_item.item_code,
-					doc.procurement_source_name
-				)
-			)
+	if len(missing) == 1:
+		frappe.throw(
+			_("Item {0} does not exist in source document {1}").format(
+				missing[0],
+				doc.procurement_source_name
+			),
+			exc=InvalidSourceItemError,
+			title="Invalid Item"
+		)
+	elif missing:
+		frappe.throw(
+			_("Items {0} do not exist in source document {1}").format(
+				", ".join(str(code) for code in missing),
+				doc.procurement_source_name
+			),
+			exc=InvalidSourceItemError,
+			title="Invalid Item"
+		)
 
 
 def validate_stock_entry_source_alignment(doc):
@@ -547,7 +858,7 @@ def validate_stock_entry_source_alignment(doc):
 	
 	# Validate purpose/warehouses alignment with source document
 
-	source_doc = frappe.get_doc(doc.procurement_source_doctype, doc.procurement_source_name)
+	source_doc = _get_source_doc(doc.procurement_source_doctype, doc.procurement_source_name)
 	purpose_value = (
 		source_doc.get("material_request_type")
 		or source_doc.get("purchase_requisition_type")
@@ -846,62 +1157,30 @@ def validate_supplier_in_rfq(doc):
 		return  # No supplier set yet, skip validation
 	
 	try:
-		# Get source RFQ
-		rfq = frappe.get_doc("Request for Quotation", doc.procurement_source_name)
-		
-		# Get list of suppliers in RFQ
-		rfq_suppliers = [s.supplier for s in rfq.suppliers] if rfq.get("suppliers") else []
+		# Get list of suppliers in the source RFQ
+		rfq_suppliers = _get_rfq_suppliers(doc.procurement_source_name)
 		
 		# Check if current supplier is in RFQ
 		if doc.supplier not in rfq_suppliers:
-			supplier_list_html = ""
+			if not _use_html_errors():
+				frappe.throw(
+					f"Supplier {doc.supplier} is not listed in Request for Quotation {doc.procurement_source_name}",
+					exc=SupplierNotInRFQError, title="Invalid Supplier for RFQ"
+				)
+			
 			if rfq_suppliers:
-				supplier_list_html = "<ul style='margin: 10px 0; padding-left: 20px;'>"
-				for supplier in rfq_suppliers:
-					supplier_list_html += f"<li style='margin: 5px 0;'><strong>{supplier}</strong></li>"
-				supplier_list_html += "</ul>"
+				supplier_list_html = "<ul style='margin: 10px 0; padding-left: 20px;'>{0}</ul>".format(
+					"".join(f"<li style='margin: 5px 0;'><strong>{supplier}</strong></li>" for supplier in rfq_suppliers)
+				)
 			else:
 				supplier_list_html = "<p style='margin: 10px 0; color: #666;'><em>No suppliers in RFQ</em></p>"
 			
-			error_msg = f"""
-			<div style="padding: 15px; background: white; border: 2px solid #dc3545; border-radius: 6px; margin: 10px 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;">
-				<h4 style="color: #dc3545; margin: 0 0 12px 0; font-size: 16px;">
-					⚠️ Supplier Not in RFQ
-				</h4>
-				
-				<div style="background: #fff3cd; padding: 12px; border-left: 4px solid #ffc107; border-radius: 4px; margin-bottom: 15px;">
-					<p style="margin: 0; color: #856404; font-size: 14px;">
-						Supplier <strong style="color: #dc3545;">{doc.supplier}</strong> is not listed in the source RFQ.
-					</p>
-				</div>
-				
-				<table style="width: 100%; border-collapse: collapse; margin-bottom: 12px;">
-					<tr style="border-bottom: 1px solid #e9ecef;">
-						<td style="padding: 6px 0; color: #495057;">Source RFQ:</td>
-						<td style="padding: 6px 0; text-align: right;">
-							<strong><a href="/app/request-for-quotation/{doc.procurement_source_name}" target="_blank" style="color: #007bff;">{doc.procurement_source_name}</a></strong>
-						</td>
-					</tr>
-					<tr style="border-bottom: 1px solid #e9ecef;">
-						<td style="padding: 6px 0; color: #495057;">Attempted Supplier:</td>
-						<td style="padding: 6px 0; text-align: right;">
-							<strong style="color: #dc3545;">{doc.supplier}</strong>
-						</td>
-					</tr>
-				</table>
-				
-				<div style="margin-bottom: 10px;">
-					<p style="margin: 0 0 6px 0; font-weight: 600; color: #495057; font-size: 13px;">📋 Allowed Suppliers in RFQ:</p>
-					{supplier_list_html}
-				</div>
-				
-				<p style="margin: 0; color: #004085; font-size: 12px; padding: 8px; background: #e7f3ff; border-radius: 4px;">
-					<strong>💡 Tip:</strong> Only suppliers listed in the RFQ can submit quotations.
-					Please select one of the allowed suppliers or add this supplier to the RFQ first.
-				</p>
-			</div>
-			"""
-			frappe.throw(error_msg, title=f"Invalid Supplier for RFQ")
+			error_msg = _SUPPLIER_NOT_IN_RFQ_TMPL.format(
+				supplier=doc.supplier,
+				rfq_name=doc.procurement_source_name,
+				supplier_list_html=supplier_list_html
+			)
+			frappe.throw(error_msg, exc=SupplierNotInRFQError, title="Invalid Supplier for RFQ")
 			
 	except frappe.DoesNotExistError:
 		# RFQ not found, log but don't block
@@ -911,17 +1190,30 @@ def validate_supplier_in_rfq(doc):
 		)
 
 
+def _get_rfq_suppliers(rfq_name):
+	"""
+	Suppliers invited in an RFQ, read from its suppliers child table.
+	Raises DoesNotExistError if the RFQ is missing.
+	"""
+	suppliers = frappe.get_all(
+		"Request for Quotation Supplier",
+		filters={"parenttype": "Request for Quotation", "parentfield": "suppliers", "parent": rfq_name},
+		pluck="supplier",
+		order_by="idx asc"
+	)
+	if not suppliers and not frappe.db.exists("Request for Quotation", rfq_name):
+		raise frappe.DoesNotExistError(f"Request for Quotation {rfq_name} not found")
+	return suppliers
+
+
 def create_backward_link(source_doctype, source_name, target_doctype, target_name):
 	"""
 	Create a backward link from source to target document.
 	This is called after submit of the target document.
 	"""
 	try:
-		# Add link to source document
-		source_doc = frappe.get_doc(source_doctype, source_name)
-		
 		# Check if procurement_links field exists (custom fields must be set up)
-		if not source_doc.meta.has_field("procurement_links"):
+		if not frappe.get_meta(source_doctype).has_field("procurement_links"):
 			frappe.log_error(
 				title="Procurement Links Field Not Found",
 				message=f"The procurement_links field does not exist in {source_doctype}. "
@@ -930,26 +1222,61 @@ def create_backward_link(source_doctype, source_name, target_doctype, target_nam
 			)
 			return
 		
+		source_docstatus = frappe.db.get_value(source_doctype, source_name, "docstatus")
+		if source_docstatus is None:
+			raise frappe.DoesNotExistError(f"{source_doctype} {source_name} not found")
+		
+		link_filters = {
+			"parenttype": source_doctype,
+			"parentfield": "procurement_links",
+			"parent": source_name
+		}
+		
 		# Check if link already exists
-		existing_links = source_doc.get("procurement_links") or []
-		for link in existing_links:
-			if (link.target_doctype == target_doctype and
-				link.target_docname == target_name):
-				return  # Link already exists
+		if frappe.db.exists(
+			"Procurement Document Link",
+			{**link_filters, "target_doctype": target_doctype, "target_docname": target_name}
+		):
+			return  # Link already exists
 		
-		# Add new link
-		source_doc.append("procurement_links", {
+		# Insert the link row directly instead of saving the (submitted) source
+		# document, which would re-run its validation and rewrite every child table
+		timestamp = now()
+		last_idx = frappe.db.sql(
+			"""
+			SELECT MAX(idx) FROM `tabProcurement Document Link`
+			WHERE parenttype = %(parenttype)s AND parentfield = %(parentfield)s AND parent = %(parent)s
+			""",
+			link_filters
+		)[0][0] or 0
+		frappe.get_doc({
+			"doctype": "Procurement Document Link",
+			"name": frappe.generate_hash(length=10),
+			"parenttype": source_doctype,
+			"parentfield": "procurement_links",
+			"parent": source_name,
+			"idx": last_idx + 1,
+			"docstatus": source_docstatus,
+			"owner": frappe.session.user,
+			"modified_by": frappe.session.user,
+			"creation": timestamp,
+			"modified": timestamp,
 			"source_doctype": source_doctype,
 			"source_docname": source_name,
 			"target_doctype": target_doctype,
 			"target_docname": target_name,
-			"link_date": now()
-		})
+			"link_date": timestamp
+		}).db_insert()
 		
-		# Allow updating child tables on submitted documents
-		source_doc.flags.ignore_validate_update_after_submit = True
-		source_doc.save(ignore_permissions=True)
-		frappe.db.commit()
+		# Bump the parent's modified like the former save did, so open forms reload
+		frappe.db.set_value(
+			source_doctype,
+			source_name,
+			{"modified": timestamp, "modified_by": frappe.session.user},
+			update_modified=False
+		)
+		frappe.clear_document_cache(source_doctype, source_name)
+		_forget_source_doc(source_doctype, source_name)
 		
 	except Exception as e:
 		# Log the error but don't block the submission
@@ -970,22 +1297,24 @@ def get_document_chain(doctype, docname):
 		"forward": []
 	}
 	
-	# Get current document
-	doc = frappe.get_doc(doctype, docname)
+	if not frappe.db.exists(doctype, docname):
+		raise frappe.DoesNotExistError(_("{0} {1} not found").format(_(doctype), docname))
 	
-	# Get backward chain (source documents)
-	if doc.get("procurement_source_doctype") and doc.get("procurement_source_name"):
-		source_chain = get_document_chain(
-			doc.procurement_source_doctype,
-			doc.procurement_source_name
-		)
-		chain["backward"] = source_chain["backward"] + [{
-			"doctype": doc.procurement_source_doctype,
-			"name": doc.procurement_source_name
-		}]
+	# Get backward chain (source documents), root first.
+	# Walked iteratively reading only the procurement_source_* columns.
+	for source_doctype, source_name in reversed(_get_procurement_ancestors(doctype, docname)):
+		chain["backward"].append({
+			"doctype": source_doctype,
+			"name": source_name
+		})
 	
-	# Get forward chain (target documents)
-	forward_links = doc.get("procurement_links") or []
+	# Get forward chain (target documents) straight from the link table
+	forward_links = frappe.get_all(
+		"Procurement Document Link",
+		filters={"parent": docname, "parenttype": doctype},
+		fields=["target_doctype", "target_docname"],
+		order_by="idx asc"
+	)
 	for link in forward_links:
 		chain["forward"].append({
 			"doctype": link.target_doctype,
@@ -1004,26 +1333,16 @@ def _has_procurement_source_fields(doctype):
 		return False
 
 
-def _get_submitted_procurement_children(parent_doctype, parent_name):
-	"""Find direct submitted children from procurement flow links.
+def _iter_submitted_procurement_children(parent_doctype, parent_name):
+	"""Yield ``(doctype, name)`` of direct submitted children, querying lazily.
 
 	Primary lookup uses ``procurement_source_*`` fields.
 	Fallbacks cover legacy/standard ERPNext links for:
 	- Payment Request (``reference_doctype/reference_name``)
 	- Payment Entry from Payment Request (``reference_no`` and reference table)
-	"""
-	children = []
-	seen = set()
-
-	def _append(dt, dn):
-		if not dn:
-			return
-		key = (dt, dn)
-		if key in seen:
-			return
-		seen.add(key)
-		children.append({"doctype": dt, "name": dn})
 
+	The same child may be yielded more than once.
+	"""
 	for dt in PROCUREMENT_DOCTYPES:
 		if not _has_procurement_source_fields(dt):
 			continue
@@ -1037,7 +1356,7 @@ def _get_submitted_procurement_children(parent_doctype, parent_name):
 			},
 			fields=["name"],
 		):
-			_append(dt, row.name)
+			yield dt, row.name
 
 	# Legacy/standard fallback: Payment Request linked via reference fields.
 	for row in frappe.get_all(
@@ -1049,7 +1368,7 @@ def _get_submitted_procurement_children(parent_doctype, parent_name):
 		},
 		fields=["name"],
 	):
-		_append("Payment Request", row.name)
+		yield "Payment Request", row.name
 
 	# Legacy/standard fallback: Payment Entry linked from Payment Request.
 	if parent_doctype == "Payment Request":
@@ -1061,7 +1380,7 @@ def _get_submitted_procurement_children(parent_doctype, parent_name):
 			},
 			fields=["name"],
 		):
-			_append("Payment Entry", row.name)
+			yield "Payment Entry", row.name
 
 		ref_rows = frappe.get_all(
 			"Payment Entry Reference",
@@ -1081,11 +1400,31 @@ def _get_submitted_procurement_children(parent_doctype, parent_name):
 				},
 				fields=["name"],
 			):
-				_append("Payment Entry", row.name)
+				yield "Payment Entry", row.name
+
+
+def _get_submitted_procurement_children(parent_doctype, parent_name):
+	"""Find direct submitted children from procurement flow links (deduplicated)."""
+	children = []
+	seen = set()
+
+	for dt, dn in _iter_submitted_procurement_children(parent_doctype, parent_name):
+		if not dn or (dt, dn) in seen:
+			continue
+		seen.add((dt, dn))
+		children.append({"doctype": dt, "name": dn})
 
 	return children
 
 
+def _has_submitted_procurement_children(parent_doctype, parent_name):
+	"""Return True as soon as one direct submitted child is found."""
+	for _dt, dn in _iter_submitted_procurement_children(parent_doctype, parent_name):
+		if dn:
+			return True
+	return False
+
+
 def _get_all_submitted_descendants(doctype, docname):
 	"""Breadth-first traversal to find all submitted downstream procurement docs."""
 	descendants = []
@@ -1112,6 +1451,9 @@ def _get_all_submitted_descendants(doctype, docname):
 
 def _get_procurement_ancestors(doctype, docname):
 	"""Return upstream chain based on procurement_source_* fields."""
+	if frappe.db.db_type == "mariadb":
+		return _get_procurement_ancestors_cte(doctype, docname)
+
 	ancestors = []
 	visited = set()
 	current_doctype, current_name = doctype, docname
@@ -1141,6 +1483,57 @@ def _get_procurement_ancestors(doctype, docname):
 	return ancestors
 
 
+def _get_procurement_ancestors_cte(doctype, docname):
+	"""
+	Same result as the iterative walk in _get_procurement_ancestors, fetched in
+	one round trip with a recursive CTE. MariaDB only: the recursive part has
+	one branch per procurement doctype, which Postgres does not allow.
+	"""
+	if not _has_procurement_source_fields(doctype):
+		return []
+
+	source_doctypes = [dt for dt in PROCUREMENT_DOCTYPES if _has_procurement_source_fields(dt)]
+	recursive_parts = " UNION ALL ".join(
+		f"""
+		SELECT {frappe.db.escape(dt)}, t.name, t.procurement_source_doctype, t.procurement_source_name, c.depth + 1
+		FROM `tab{dt}` t
+		INNER JOIN chain c ON c.source_doctype = {frappe.db.escape(dt)} AND t.name = c.source_name
+		WHERE c.depth < %(max_depth)s
+		"""
+		for dt in source_doctypes
+	)
+	rows = frappe.db.sql(
+		f"""
+		WITH RECURSIVE chain (doctype, name, source_doctype, source_name, depth) AS (
+			SELECT CAST(%(doctype)s AS CHAR(140)), name, procurement_source_doctype, procurement_source_name, 0
+			FROM `tab{doctype}`
+			WHERE name = %(docname)s
+			UNION ALL
+			{recursive_parts}
+		)
+		SELECT doctype, name, source_doctype, source_name
+		FROM chain
+		ORDER BY depth
+		""",
+		{"doctype": doctype, "docname": docname, "max_depth": 50},
+		as_dict=True,
+	)
+
+	# Replay the iterative walk over the fetched rows, including its cycle guard
+	ancestors = []
+	visited = set()
+	for row in rows:
+		key = (row.doctype, row.name)
+		if key in visited:
+			break
+		visited.add(key)
+		if not row.source_doctype or not row.source_name:
+			break
+		ancestors.append((row.source_doctype, row.source_name))
+
+	return ancestors
+
+
 @frappe.whitelist()
 def get_submitted_linked_docs_forward_only(doctype: str, name: str):
 	"""
@@ -1150,6 +1543,8 @@ def get_submitted_linked_docs_forward_only(doctype: str, name: str):
 	ancestors (e.g. PI showing PR/PO/Payment Request). For procurement doctypes,
 	we keep only true downstream links.
 	"""
+	from frappe.desk.form.linked_with import get_submitted_linked_docs as _core_get_submitted_linked_docs
+
 	result = _core_get_submitted_linked_docs(doctype, name)
 	docs = (result or {}).get("docs") or []
 
@@ -1205,6 +1600,11 @@ def check_can_cancel(doc, method=None):
 		ignore.append("Procurement Document Link")
 	doc.ignore_linked_doctypes = ignore
 
+	# Descendants are only reachable through submitted direct children, so a
+	# document without any can be cancelled without walking the tree.
+	if not _has_submitted_procurement_children(doc.doctype, doc.name):
+		return
+
 	active_children = _get_all_submitted_descendants(doc.doctype, doc.name)
 
 	if not active_children:
@@ -1214,52 +1614,33 @@ def check_can_cancel(doc, method=None):
 	for child in active_children:
 		docs_by_type.setdefault(child["doctype"], []).append(child["name"])
 
-	child_docs_html = ""
-	for doctype, doc_names in docs_by_type.items():
-		child_docs_html += f"<div style='margin: 8px 0;'>"
-		child_docs_html += f"<strong style='color: #495057;'>{doctype}</strong> "
-		child_docs_html += f"<span style='background: #e9ecef; padding: 2px 8px; border-radius: 10px; font-size: 11px; font-weight: 600;'>{len(doc_names)}</span>"
-		child_docs_html += "<ul style='margin: 5px 0 0 0; padding-left: 20px;'>"
-		for child_name in doc_names:
-			doc_link = f"/app/{doctype.lower().replace(' ', '-')}/{child_name}"
-			child_docs_html += f"""
-				<li style="margin: 3px 0;">
-					<a href="{doc_link}" target="_blank" style="color: #007bff; text-decoration: none;">
-						{child_name}
-					</a>
-				</li>
-			"""
-		child_docs_html += "</ul></div>"
-
-	error_msg = f"""
-	<div style="padding: 20px; background: white; border: 2px solid #dc3545; border-radius: 8px; margin: 10px 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;">
-		<h4 style="color: #dc3545; margin: 0 0 15px 0; font-size: 18px; display: flex; align-items: center; gap: 8px;">
-			<span style="font-size: 24px;">🚫</span>
-			Cannot Cancel Document
-		</h4>
-
-		<div style="background: #fff3cd; padding: 12px; border-left: 4px solid #ffc107; border-radius: 4px; margin-bottom: 15px;">
-			<p style="margin: 0; color: #856404; font-size: 14px;">
-				This document has <strong>{len(active_children)} active downstream document{'s' if len(active_children) > 1 else ''}</strong> that must be cancelled first.
-			</p>
-		</div>
-
-		<div style="margin-bottom: 15px;">
-			<p style="margin: 0 0 10px 0; font-weight: 600; color: #495057; font-size: 14px;">
-				📋 Active Downstream Documents:
-			</p>
-			{child_docs_html}
-		</div>
-
-		<div style="background: #e7f3ff; padding: 12px; border-radius: 4px; margin-top: 15px;">
-			<p style="margin: 0; color: #004085; font-size: 13px;">
-				<strong>💡 Tip:</strong> Cancel the latest documents first, then cancel this document.
-			</p>
-		</div>
-	</div>
-	"""
+	if not _use_html_errors():
+		frappe.throw(
+			"Cancel the active downstream documents first: {0}".format(
+				"; ".join(f"{doctype}: {', '.join(names)}" for doctype, names in docs_by_type.items())
+			),
+			exc=CannotCancelError, title="Cancellation Not Allowed"
+		)
 
-	frappe.throw(error_msg, title="Cancellation Not Allowed")
+	child_docs_html = "".join(
+		_CANCEL_CHILD_GROUP_TMPL.format(
+			doctype=doctype,
+			count=len(doc_names),
+			rows="".join(
+				_CANCEL_CHILD_ROW_TMPL.format(route=_route_slug(doctype), name=child_name)
+				for child_name in doc_names
+			)
+		)
+		for doctype, doc_names in docs_by_type.items()
+	)
+
+	error_msg = _CANNOT_CANCEL_TMPL.format(
+		count=len(active_children),
+		plural="s" if len(active_children) > 1 else "",
+		child_docs_html=child_docs_html
+	)
+
+	frappe.throw(error_msg, exc=CannotCancelError, title="Cancellation Not Allowed")
 
 
 def on_procurement_cancel(doc, method=None):
@@ -1275,6 +1656,109 @@ def on_procurement_cancel(doc, method=None):
 	doc.ignore_linked_doctypes = ignore
 
 
+def _get_consumed_child_doc_names(source_doctype, source_name, target_doctype, exclude_doc=None):
+	"""
+	Names of the non-cancelled target documents created from a source, shared by
+	get_consumed_quantities and get_consumed_quantities_detailed.
+	
+	Purchase Orders are found through their Supplier Quotations when the source
+	is an RFQ. Returns None when a Stock Entry has to fall back to Material
+	Request references (see _get_stock_entry_mr_consumption).
+	"""
+	child_docs = frappe.get_all(
+		target_doctype,
+		filters={
+			"procurement_source_doctype": source_doctype,
+			"procurement_source_name": source_name,
+			"docstatus": ["!=", 2]  # Not cancelled
+		},
+		pluck="name"
+	)
+	
+	# Handle indirect chain: PO → SQ → RFQ
+	# When tracking Purchase Order quantities against an RFQ, POs don't point directly
+	# to the RFQ — they point to a Supplier Quotation which in turn points to the RFQ.
+	if (not child_docs
+		and target_doctype == "Purchase Order"
+		and source_doctype == "Request for Quotation"):
+		sqs = frappe.get_all("Supplier Quotation",
+			filters={
+				"procurement_source_doctype": "Request for Quotation",
+				"procurement_source_name": source_name,
+				"docstatus": ["!=", 2]
+			},
+			pluck="name"
+		)
+		if sqs:
+			child_docs = frappe.get_all("Purchase Order",
+				filters={
+					"procurement_source_doctype": "Supplier Quotation",
+					"procurement_source_name": ["in", sqs],
+					"docstatus": ["!=", 2]  # Not cancelled (includes drafts)
+				},
+				pluck="name"
+			)
+			frappe.logger("next_custom_app").debug(
+				"Found %s POs via indirect RFQ→SQ→PO chain (RFQ: %s, SQs: %s)",
+				len(child_docs), source_name, sqs
+			)
+	
+	# Fallback for Stock Entry created via standard ERPNext routes (might not have procurement_source fields)
+	if not child_docs and target_doctype == "Stock Entry" and source_doctype == "Material Request":
+		return None
+	
+	frappe.logger("next_custom_app").debug(
+		"Found %s %s documents from %s %s (excluding %s)",
+		len(child_docs), target_doctype, source_doctype, source_name, exclude_doc
+	)
+	
+	# Skip the document being excluded (current doc during validation)
+	return [name for name in child_docs if not (exclude_doc and name == exclude_doc)]
+
+
+def _get_stock_entry_mr_consumption(material_request, exclude_doc=None, per_document=False):
+	"""
+	Stock Entry quantities per item_code (and per Stock Entry if ``per_document``)
+	for a Material Request, found through Material Request references on:
+	- Stock Entry Detail.material_request
+	- Stock Entry Detail.material_request_item -> Material Request Item.parent
+	- Stock Entry header material_request/material_request_no (if present)
+	"""
+	params = {"mr": material_request}
+	exclude_clause = ""
+	if exclude_doc:
+		exclude_clause = " AND se.name != %(exclude_doc)s"
+		params["exclude_doc"] = exclude_doc
+
+	se_mr_field = "se.material_request" if _table_has_column("tabStock Entry", "material_request") else "NULL"
+	se_mr_no_field = "se.material_request_no" if _table_has_column("tabStock Entry", "material_request_no") else "NULL"
+	name_column = "se.name as name," if per_document else ""
+	group_by = "se.name, sed.item_code" if per_document else "sed.item_code"
+
+	return frappe.db.sql(
+		f"""
+		SELECT
+			{name_column}
+			sed.item_code as item_code,
+			SUM(sed.qty) as qty
+		FROM `tabStock Entry` se
+		INNER JOIN `tabStock Entry Detail` sed ON sed.parent = se.name
+		LEFT JOIN `tabMaterial Request Item` mri ON mri.name = sed.material_request_item
+		WHERE se.docstatus != 2
+			AND (
+				sed.material_request = %(mr)s
+				OR mri.parent = %(mr)s
+				OR {se_mr_field} = %(mr)s
+				OR {se_mr_no_field} = %(mr)s
+			)
+			{exclude_clause}
+		GROUP BY {group_by}
+		""",
+		params,
+		as_dict=True,
+	)
+
+
 def get_consumed_quantities_detailed(source_doctype, source_name, target_doctype, exclude_doc=None):
 	"""
 	Get detailed consumed quantities with document-level breakdown for better error messages.
@@ -1297,110 +1781,42 @@ def get_consumed_quantities_detailed(source_doctype, source_name, target_doctype
 		return consumed
 	
 	try:
-		child_docs = frappe.get_all(
-			target_doctype,
-			filters={
-				"procurement_source_doctype": source_doctype,
-				"procurement_source_name": source_name,
-				"docstatus": ["!=", 2]  # Not cancelled
-			},
-			fields=["name"]
-		)
-
-		# Handle indirect chain: PO → SQ → RFQ
-		# When tracking Purchase Order quantities against an RFQ, POs don't point directly
-		# to the RFQ — they point to a Supplier Quotation which in turn points to the RFQ.
-		# We need to find all POs whose source SQ points to this RFQ.
-		if (not child_docs
-			and target_doctype == "Purchase Order"
-			and source_doctype == "Request for Quotation"):
-			# Find all Supplier Quotations from this RFQ
-			sqs = frappe.get_all("Supplier Quotation",
-				filters={
-					"procurement_source_doctype": "Request for Quotation",
-					"procurement_source_name": source_name,
-					"docstatus": ["!=", 2]
-				},
-				pluck="name"
-			)
-			if sqs:
-				# Find all POs from these SQs
-				child_docs = frappe.get_all("Purchase Order",
-					filters={
-						"procurement_source_doctype": "Supplier Quotation",
-						"procurement_source_name": ["in", sqs],
-						"docstatus": ["!=", 2]  # Not cancelled (includes drafts)
-					},
-					fields=["name"]
-				)
-				frappe.logger().info(
-					f"Found {len(child_docs)} POs via indirect RFQ→SQ→PO chain "
-					f"(RFQ: {source_name}, SQs: {sqs})"
-				)
-
-		# Fallback for Stock Entry created via standard ERPNext routes (might not have procurement_source fields)
-		# Material Request references may exist either on:
-		# - Stock Entry Detail.material_request
-		# - Stock Entry Detail.material_request_item -> Material Request Item.parent
-		# - Stock Entry header material_request/material_request_no (if present)
-		if (not child_docs and target_doctype == "Stock Entry" and source_doctype == "Material Request"):
-			params = {"mr": source_name}
-			exclude_clause = ""
-			if exclude_doc:
-				exclude_clause = " AND se.name != %(exclude_doc)s"
-				params["exclude_doc"] = exclude_doc
-
-			se_mr_field = "se.material_request" if _table_has_column("tabStock Entry", "material_request") else "NULL"
-			se_mr_no_field = "se.material_request_no" if _table_has_column("tabStock Entry", "material_request_no") else "NULL"
-
-			rows = frappe.db.sql(
-				f"""
-				SELECT
-					se.name as name,
-					sed.item_code as item_code,
-					SUM(sed.qty) as qty
-				FROM `tabStock Entry` se
-				INNER JOIN `tabStock Entry Detail` sed ON sed.parent = se.name
-				LEFT JOIN `tabMaterial Request Item` mri ON mri.name = sed.material_request_item
-				WHERE se.docstatus != 2
-					AND (
-						sed.material_request = %(mr)s
-						OR mri.parent = %(mr)s
-						OR {se_mr_field} = %(mr)s
-						OR {se_mr_no_field} = %(mr)s
-					)
-					{exclude_clause}
-				GROUP BY se.name, sed.item_code
-				""",
-				params,
-				as_dict=True,
-			)
-			for r in rows or []:
-				item_code = r.get("item_code")
-				qty = r.get("qty") or 0
-				name = r.get("name")
-				if not item_code or not name:
+		doc_names = _get_consumed_child_doc_names(source_doctype, source_name, target_doctype, exclude_doc)
+		
+		# Stock Entry without procurement_source fields: use Material Request references
+		if doc_names is None:
+			for r in _get_stock_entry_mr_consumption(source_name, exclude_doc, per_document=True):
+				if not r.item_code or not r.name:
 					continue
-				if item_code not in consumed:
-					consumed[item_code] = {"total": 0, "documents": []}
-				consumed[item_code]["total"] += qty
-				consumed[item_code]["documents"].append({
-					"name": name,
+				qty = r.qty or 0
+				if r.item_code not in consumed:
+					consumed[r.item_code] = {"total": 0, "documents": []}
+				consumed[r.item_code]["total"] += qty
+				consumed[r.item_code]["documents"].append({
+					"name": r.name,
 					"qty": qty,
 				})
 			return consumed
 		
-		for child_doc_ref in child_docs:
-			doc_name = child_doc_ref.name
-			
-			if exclude_doc and doc_name == exclude_doc:
-				continue
+		# Read the item rows of every child document in a single query
+		items_doctype = _get_items_child_doctype(target_doctype)
+		if doc_names and items_doctype:
+			items_by_parent = {}
+			for item in frappe.get_all(
+				items_doctype,
+				filters={
+					"parenttype": target_doctype,
+					"parentfield": target_items_field,
+					"parent": ["in", doc_names]
+				},
+				fields=["parent", "item_code", "qty"],
+				order_by="idx asc"
+			):
+				items_by_parent.setdefault(item.parent, []).append(item)
 			
-			try:
-				target_doc = frappe.get_doc(target_doctype, doc_name)
-				items = target_doc.get(target_items_field) or []
-				
-				for item in items:
+			# Keep the document order of the child_docs listing in the breakdown
+			for doc_name in doc_names:
+				for item in items_by_parent.get(doc_name, ()):
 					item_code = item.item_code
 					qty = item.qty or 0
 					
@@ -1412,9 +1828,6 @@ def get_consumed_quantities_detailed(source_doctype, source_name, target_doctype
 						"name": doc_name,
 						"qty": qty
 					})
-					
-			except frappe.DoesNotExistError:
-				pass
 				
 	except Exception as e:
 		frappe.log_error(
@@ -1434,7 +1847,8 @@ def get_parallel_step_doctypes(source_doctype, target_doctype, flow_name=None):
 		flow_name = active_flow.name
 	
 	steps = get_flow_steps(flow_name)
-	matching = [step for step in steps if step.doctype_name == target_doctype]
+	step_index = get_flow_step_index(flow_name)
+	matching = [steps[i] for i in step_index["by_doctype"].get(target_doctype, ())]
 	if not matching:
 		return [target_doctype]
 
@@ -1444,8 +1858,7 @@ def get_parallel_step_doctypes(source_doctype, target_doctype, flow_name=None):
 	if step_groups:
 		return [step.doctype_name for step in steps if getattr(step, "step_group", None) in step_groups]
 
-	step_no = min(step.step_no for step in matching)
-	return [step.doctype_name for step in steps if step.step_no == step_no]
+	return [steps[i].doctype_name for i in step_index["by_step_no"][matching[0].step_no]]
 
 
 def get_parallel_consumed_breakdown(source_doctype, source_name, target_doctype, exclude_doc=None, flow_name=None):
@@ -1487,102 +1900,30 @@ def get_consumed_quantities(source_doctype, source_name, target_doctype, exclude
 	
 	# Query database for ALL documents of target type that reference this source
 	try:
-		child_docs = frappe.get_all(
-			target_doctype,
-			filters={
-				"procurement_source_doctype": source_doctype,
-				"procurement_source_name": source_name,
-				"docstatus": ["!=", 2]  # Not cancelled
-			},
-			fields=["name"]
-		)
-
-		# Handle indirect chain: PO → SQ → RFQ
-		# When tracking Purchase Order quantities against an RFQ, POs don't point directly
-		# to the RFQ — they point to a Supplier Quotation which in turn points to the RFQ.
-		if (not child_docs
-			and target_doctype == "Purchase Order"
-			and source_doctype == "Request for Quotation"):
-			sqs = frappe.get_all("Supplier Quotation",
-				filters={
-					"procurement_source_doctype": "Request for Quotation",
-					"procurement_source_name": source_name,
-					"docstatus": ["!=", 2]
-				},
-				pluck="name"
-			)
-			if sqs:
-				child_docs = frappe.get_all("Purchase Order",
-					filters={
-						"procurement_source_doctype": "Supplier Quotation",
-						"procurement_source_name": ["in", sqs],
-						"docstatus": ["!=", 2]
-					},
-					fields=["name"]
-				)
-
-		# Fallback for Stock Entry created without procurement_source fields (standard ERPNext flow)
-		if (not child_docs and target_doctype == "Stock Entry" and source_doctype == "Material Request"):
-			params = {"mr": source_name}
-			exclude_clause = ""
-			if exclude_doc:
-				exclude_clause = " AND se.name != %(exclude_doc)s"
-				params["exclude_doc"] = exclude_doc
-
-			se_mr_field = "se.material_request" if _table_has_column("tabStock Entry", "material_request") else "NULL"
-			se_mr_no_field = "se.material_request_no" if _table_has_column("tabStock Entry", "material_request_no") else "NULL"
-
+		doc_names = _get_consumed_child_doc_names(source_doctype, source_name, target_doctype, exclude_doc)
+		
+		# Stock Entry without procurement_source fields: use Material Request references
+		if doc_names is None:
+			for r in _get_stock_entry_mr_consumption(source_name, exclude_doc, per_document=False):
+				if r.item_code:
+					consumed[r.item_code] = consumed.get(r.item_code, 0) + (r.qty or 0)
+			return consumed
+		
+		# Sum the item rows of every child document per item_code in the database
+		items_doctype = _get_items_child_doctype(target_doctype)
+		if doc_names and items_doctype:
 			rows = frappe.db.sql(
 				f"""
-				SELECT
-					sed.item_code as item_code,
-					SUM(sed.qty) as qty
-				FROM `tabStock Entry` se
-				INNER JOIN `tabStock Entry Detail` sed ON sed.parent = se.name
-				LEFT JOIN `tabMaterial Request Item` mri ON mri.name = sed.material_request_item
-				WHERE se.docstatus != 2
-					AND (
-						sed.material_request = %(mr)s
-						OR mri.parent = %(mr)s
-						OR {se_mr_field} = %(mr)s
-						OR {se_mr_no_field} = %(mr)s
-					)
-					{exclude_clause}
-				GROUP BY sed.item_code
+				SELECT item_code, SUM(IFNULL(qty, 0))
+				FROM `tab{items_doctype}`
+				WHERE parenttype = %(parenttype)s
+					AND parentfield = %(parentfield)s
+					AND parent IN %(parents)s
+				GROUP BY item_code
 				""",
-				params,
-				as_dict=True,
+				{"parenttype": target_doctype, "parentfield": target_items_field, "parents": tuple(doc_names)}
 			)
-			for r in rows or []:
-				item_code = r.get("item_code")
-				qty = r.get("qty") or 0
-				if item_code:
-					consumed[item_code] = consumed.get(item_code, 0) + qty
-			return consumed
-		
-		frappe.logger().info(f"Found {len(child_docs)} {target_doctype} documents from {source_doctype} {source_name}")
-		
-		# Calculate consumed quantities from each child document
-		for child_doc_ref in child_docs:
-			doc_name = child_doc_ref.name
-			
-			# Skip if this is the document being excluded (current doc during validation)
-			if exclude_doc and doc_name == exclude_doc:
-				frappe.logger().info(f"Excluding current document: {doc_name}")
-				continue
-			
-			try:
-				target_doc = frappe.get_doc(target_doctype, doc_name)
-				items = target_doc.get(target_items_field) or []
-				
-				for item in items:
-					item_code = item.item_code
-					qty = item.qty or 0
-					consumed[item_code] = consumed.get(item_code, 0) + qty
-					frappe.logger().info(f"Added {qty} of {item_code} from {doc_name}, total consumed: {consumed[item_code]}")
-					
-			except frappe.DoesNotExistError:
-				pass
+			consumed.update(rows)
 				
 	except Exception as e:
 		frappe.log_error(
@@ -1600,15 +1941,8 @@ def get_document_item_quantities(doctype, docname):
 	"""
 	quantities = {}
 	
-	try:
-		doc = frappe.get_doc(doctype, docname)
-		items_field = get_items_field_name(doctype)
-		if items_field:
-			items = doc.get(items_field) or []
-			for item in items:
-				quantities[item.item_code] = item.qty or 0
-	except frappe.DoesNotExistError:
-		pass
+	for item in _get_item_rows(doctype, docname):
+		quantities[item.item_code] = item.qty or 0
 	
 	return quantities
 
@@ -1617,17 +1951,49 @@ def get_items_field_name(doctype):
 	"""
 	Get the field name that contains items for different procurement doctypes.
 	"""
-	items_field_map = {
-		"Material Request": "items",
-		"Purchase Requisition": "items",
-		"Request for Quotation": "items",
-		"Supplier Quotation": "items",
-		"Purchase Order": "items",
-		"Purchase Receipt": "items",
-		"Purchase Invoice": "items",
-		"Stock Entry": "items"
-	}
-	return items_field_map.get(doctype)
+	return PROCUREMENT_ITEMS_FIELD.get(doctype)
+
+
+def _get_items_child_doctype(doctype):
+	"""Return the child DocType behind the items table of a procurement doctype."""
+	items_field = get_items_field_name(doctype)
+	if not items_field:
+		return None
+	field = frappe.get_meta(doctype).get_field(items_field)
+	return field.options if field else None
+
+
+def _get_item_rows(doctype, docname, fields=("item_code", "qty")):
+	"""Read the items child rows of a procurement document without loading the document."""
+	items_doctype = _get_items_child_doctype(doctype)
+	if not items_doctype:
+		return []
+	return frappe.get_all(
+		items_doctype,
+		filters={
+			"parenttype": doctype,
+			"parentfield": get_items_field_name(doctype),
+			"parent": docname
+		},
+		fields=list(fields),
+		order_by="idx asc"
+	)
+
+
+def _get_source_item_rows(source_doctype, source_name):
+	"""
+	Item rows (item_code, qty) of a source document, memoized for the current
+	request like _get_source_doc and dropped with it by _forget_source_doc.
+	Shared by the validators run from validate_procurement_document, including
+	repeated saves of the same document within one request.
+	"""
+	if not hasattr(frappe.local, "procurement_source_item_rows"):
+		frappe.local.procurement_source_item_rows = {}
+
+	key = (source_doctype, source_name)
+	if key not in frappe.local.procurement_source_item_rows:
+		frappe.local.procurement_source_item_rows[key] = _get_item_rows(source_doctype, source_name)
+	return frappe.local.procurement_source_item_rows[key]
 
 
 @frappe.whitelist()
@@ -1636,13 +2002,12 @@ def get_available_quantities(source_doctype, source_name, target_doctype):
 	API method to get available quantities for each item in the source document.
 	Used by client-side scripts to show available quantities.
 	"""
-	source_doc = frappe.get_doc(source_doctype, source_name)
-	source_items_field = get_items_field_name(source_doctype)
-	
-	if not source_items_field:
+	if not get_items_field_name(source_doctype):
 		return {}
 	
-	source_items = source_doc.get(source_items_field) or []
+	source_items = _get_item_rows(source_doctype, source_name)
+	if not source_items:
+		return {}
 	consumed_quantities = get_consumed_quantities(source_doctype, source_name, target_doctype)
 	
 	available = {}
@@ -1689,18 +2054,16 @@ def get_linked_documents_with_counts(doctype, docname):
 			current_doctype = source_doctype
 			current_name = source_name
 			
-			while current_doctype and current_name:
+			backward_chain.append({
+				"doctype": current_doctype,
+				"name": current_name
+			})
+			# Get the remaining parents, reading only their link columns
+			for parent_doctype, parent_name in _get_parent_chain(current_doctype, current_name):
 				backward_chain.append({
-					"doctype": current_doctype,
-					"name": current_name
+					"doctype": parent_doctype,
+					"name": parent_name
 				})
-				
-				# Get next parent
-				try:
-					parent_doc = frappe.get_doc(current_doctype, current_name)
-					current_doctype, current_name = _resolve_parent_link(parent_doc, current_doctype)
-				except:
-					break
 			
 			# Group by doctype and count
 			backward_by_type = {}
@@ -1720,132 +2083,16 @@ def get_linked_documents_with_counts(doctype, docname):
 		# Get forward links (child documents) - RECURSIVELY collecting ALL descendants
 		forward_by_type = {}
 		
-		def collect_all_descendants(dt, dn, visited=None):
-			"""Recursively collect all descendant documents"""
-			if visited is None:
-				visited = set()
-			
-			doc_key = f"{dt}::{dn}"
-			if doc_key in visited:
-				return
-			visited.add(doc_key)
-			
-			# Search database for direct children of this document
-			for child_doctype in PROCUREMENT_DOCTYPES:
-				try:
-					child_docs = []
-
-					# Check if the child doctype actually has procurement_source fields
-					# before querying, to avoid OperationalError on missing columns.
-					child_has_proc_src = frappe.get_meta(child_doctype).has_field("procurement_source_doctype")
-
-					if child_has_proc_src:
-						child_docs = frappe.get_all(
-							child_doctype,
-							filters={
-								"procurement_source_doctype": dt,
-								"procurement_source_name": dn,
-								"docstatus": ["!=", 2]  # Not cancelled
-							},
-							fields=["name"]
-						)
-
-					# Fallback for Payment Request: also check reference_doctype/reference_name
-					# This covers Payment Requests created before procurement_source fields
-					# were added, or when they were created via standard ERPNext flow.
-					if not child_docs and child_doctype == "Payment Request":
-						child_docs = frappe.get_all(
-							"Payment Request",
-							filters={
-								"reference_doctype": dt,
-								"reference_name": dn,
-								"docstatus": ["!=", 2],
-							},
-							fields=["name"],
-						)
-
-					# Fallback for Stock Entry when procurement_source fields are not set
-					if not child_docs and child_doctype == "Stock Entry" and dt == "Material Request":
-						# Use SQL so we can also resolve links via material_request_item -> Material Request Item.parent.
-						se_mr_field = "se.material_request" if _table_has_column("tabStock Entry", "material_request") else "NULL"
-						se_mr_no_field = "se.material_request_no" if _table_has_column("tabStock Entry", "material_request_no") else "NULL"
-						rows = frappe.db.sql(
-							f"""
-							SELECT DISTINCT se.name
-							FROM `tabStock Entry` se
-							INNER JOIN `tabStock Entry Detail` sed ON sed.parent = se.name
-							LEFT JOIN `tabMaterial Request Item` mri ON mri.name = sed.material_request_item
-							WHERE se.docstatus != 2
-								AND (
-									sed.material_request = %(mr)s
-									OR mri.parent = %(mr)s
-									OR {se_mr_field} = %(mr)s
-									OR {se_mr_no_field} = %(mr)s
-								)
-							""",
-							{"mr": dn},
-							as_dict=True,
-						)
-						parent_names = [r.get("name") for r in (rows or []) if r.get("name")]
-						if parent_names:
-							child_docs = frappe.get_all(
-								"Stock Entry",
-								filters={
-									"name": ["in", parent_names],
-									"docstatus": ["!=", 2]
-								},
-								fields=["name"]
-							)
-
-					# Fallback for Payment Entry: check reference_no (set to PR name by ERPNext)
-					if not child_docs and child_doctype == "Payment Entry" and dt == "Payment Request":
-						child_docs = frappe.get_all(
-							"Payment Entry",
-							filters={
-								"reference_no": dn,
-								"docstatus": ["!=", 2],
-							},
-							fields=["name"],
-						)
-						# Also check Payment Entry Reference child table
-						if not child_docs:
-							ref_rows = frappe.get_all(
-								"Payment Entry Reference",
-								filters={
-									"reference_doctype": "Payment Request",
-									"reference_name": dn,
-									"docstatus": ["!=", 2],
-								},
-								fields=["parent"],
-							)
-							if ref_rows:
-								pe_names = list(set(r.parent for r in ref_rows))
-								child_docs = frappe.get_all(
-									"Payment Entry",
-									filters={
-										"name": ["in", pe_names],
-										"docstatus": ["!=", 2],
-									},
-									fields=["name"],
-								)
-					
-					if child_docs:
-						if child_doctype not in forward_by_type:
-							forward_by_type[child_doctype] = []
-						
-						for child_doc in child_docs:
-							if child_doc.name not in forward_by_type[child_doctype]:
-								forward_by_type[child_doctype].append(child_doc.name)
-							
-							# Recursively collect descendants of this child
-							collect_all_descendants(child_doctype, child_doc.name, visited)
-							
-				except Exception as e:
-					# Doctype might not exist or other error, continue
-					pass
-		
-		# Start recursive collection from current document
-		collect_all_descendants(doctype, docname)
+		# The descendant graph is fetched one tree level per query; its keys are
+		# the root followed by every descendant in level order
+		visited = {(doctype, docname)}
+		for direct_children in _get_descendant_graph(doctype, docname).values():
+			for child in direct_children:
+				child_key = (child["doctype"], child["name"])
+				if child_key in visited:
+					continue
+				visited.add(child_key)
+				forward_by_type.setdefault(child["doctype"], []).append(child["name"])
 		
 		# Build final forward links list
 		for dt, docs in forward_by_type.items():
@@ -1879,16 +2126,22 @@ def get_document_flow_with_statuses(doctype, docname):
 	}
 	
 	try:
-		# Step 1: Find the root document (traverse backward)
-		root_doctype, root_docname = find_root_document(doctype, docname)
+		# Step 1: Find the root document (traverse backward once; the same
+		# parent chain gives both the root and the current document's path)
+		parent_chain = _get_parent_chain(doctype, docname)
+		root_doctype, root_docname = find_root_document(doctype, docname, parent_chain)
 		
 		# Step 2: Build complete tree from root
 		# Step 3: Mark the current document's path
-		current_path = get_path_to_document(doctype, docname)
+		current_path = get_path_to_document(doctype, docname, parent_chain)
 		
 		# Step 4: Build the tree with all documents
 		processed = set()
-		build_complete_tree(flow_data["nodes"], root_doctype, root_docname, current_path, processed, doctype, docname)
+		children_map = _get_descendant_graph(root_doctype, root_docname)
+		build_complete_tree(
+			flow_data["nodes"], root_doctype, root_docname, current_path, processed, doctype, docname,
+			children_map=children_map, node_values=_get_flow_node_values(children_map)
+		)
 		
 	except Exception as e:
 		frappe.log_error(
@@ -1929,162 +2182,287 @@ def _resolve_parent_link(doc, current_dt):
 	return None, None
 
 
-def find_root_document(doctype, docname):
-	"""Find the root (topmost) document by traversing backward."""
-	current_dt = doctype
-	current_name = docname
-	max_iterations = 20
-	iterations = 0
+def _get_parent_link(doctype, docname):
+	"""
+	Like _resolve_parent_link, but reads only the link columns of the document
+	instead of loading it. Returns (None, None) when there is no parent or the
+	document does not exist.
+	"""
+	fields = _get_parent_link_fields(doctype)
+	if not fields:
+		return None, None
 	
-	while iterations < max_iterations:
-		try:
-			doc = frappe.get_doc(current_dt, current_name)
-			parent_dt, parent_name = _resolve_parent_link(doc, current_dt)
-			if parent_dt and parent_name:
-				current_dt = parent_dt
-				current_name = parent_name
-				iterations += 1
-			else:
+	values = frappe.db.get_value(doctype, docname, fields, as_dict=True)
+	if not values:
+		return None, None
+	return _resolve_parent_link(values, doctype)
+
+
+def _get_parent_link_fields(doctype):
+	"""Columns _resolve_parent_link reads for a doctype."""
+	fields = []
+	if _has_procurement_source_fields(doctype):
+		fields += ["procurement_source_doctype", "procurement_source_name"]
+	if doctype == "Payment Request":
+		fields += ["reference_doctype", "reference_name"]
+	elif doctype == "Payment Entry":
+		fields.append("reference_no")
+	return fields
+
+
+def _get_parent_chain(doctype, docname, max_hops=20):
+	"""
+	Walk parent links upward from a document, reading only the link columns.
+	Returns [(doctype, name), ...] from the direct parent to the root.
+	"""
+	chain = []
+	seen = {(doctype, docname)}
+	current_dt, current_name = doctype, docname
+
+	# On MariaDB the procurement_source_* part of the chain comes back in one
+	# recursive query; only the Payment Request / Payment Entry reference
+	# fallbacks above it are still followed hop by hop.
+	if frappe.db.db_type == "mariadb" and _has_procurement_source_fields(doctype):
+		for key in _get_procurement_ancestors_cte(doctype, docname)[:max_hops]:
+			if key in seen:
 				break
-		except:
+			chain.append(key)
+			seen.add(key)
+		if chain:
+			current_dt, current_name = chain[-1]
+
+	while len(chain) < max_hops:
+		parent_dt, parent_name = _get_parent_link(current_dt, current_name)
+		if not parent_dt or not parent_name or (parent_dt, parent_name) in seen:
 			break
+		chain.append((parent_dt, parent_name))
+		seen.add((parent_dt, parent_name))
+		current_dt, current_name = parent_dt, parent_name
 	
-	return current_dt, current_name
+	return chain
 
 
-def get_path_to_document(target_doctype, target_docname):
+def find_root_document(doctype, docname, parent_chain=None):
+	"""Find the root (topmost) document by traversing backward."""
+	if parent_chain is None:
+		parent_chain = _get_parent_chain(doctype, docname)
+	return parent_chain[-1] if parent_chain else (doctype, docname)
+
+
+def get_path_to_document(target_doctype, target_docname, parent_chain=None):
 	"""Get the path from root to the target document."""
-	path = []
-	current_dt = target_doctype
-	current_name = target_docname
-	max_iterations = 20
-	iterations = 0
-	
-	# Build path backward from target to root
-	while iterations < max_iterations:
-		path.insert(0, f"{current_dt}::{current_name}")
-		try:
-			doc = frappe.get_doc(current_dt, current_name)
-			parent_dt, parent_name = _resolve_parent_link(doc, current_dt)
-			if parent_dt and parent_name:
-				current_dt = parent_dt
-				current_name = parent_name
-				iterations += 1
-			else:
-				break
-		except:
-			break
-	
-	return set(path)
+	if parent_chain is None:
+		parent_chain = _get_parent_chain(target_doctype, target_docname)
+	return {f"{dt}::{name}" for dt, name in [(target_doctype, target_docname)] + parent_chain}
 
 
 def get_direct_forward_documents(doctype, docname):
 	"""Return direct (immediate) child documents for the given node."""
-	direct_children = []
+	return _get_forward_children([(doctype, docname)])[(doctype, docname)]
+
 
-	for child_doctype in PROCUREMENT_DOCTYPES:
+def _get_forward_children(parents):
+	"""
+	Direct non-cancelled child documents of several documents at once.
+
+	procurement_source_* children of every parent, across all procurement
+	doctypes, and Payment Requests linked through reference_doctype/name come
+	back in one UNION ALL query. The Stock Entry (from Material Request) and
+	Payment Entry (from Payment Request) fallbacks are batched for all parents
+	(see _get_fallback_forward_children) and only apply to parents without a
+	child of that doctype through procurement_source_*.
+
+	Returns {(parent_doctype, parent_name): [{"doctype": ..., "name": ...}, ...]}
+	with children grouped in PROCUREMENT_DOCTYPES order.
+	"""
+	parents = list(dict.fromkeys(parents))
+	if not parents:
+		return {}
+
+	# Only doctypes whose table already has the columns: meta can list the
+	# custom fields before a migrate has added them, and one failing branch
+	# would fail the whole query
+	branches = [
+		f"""
+		SELECT {frappe.db.escape(dt)} AS doctype, name, procurement_source_doctype AS parent_doctype,
+			procurement_source_name AS parent_name, 0 AS via_reference, modified
+		FROM `tab{dt}`
+		WHERE docstatus != 2
+			AND procurement_source_doctype IN %(parent_doctypes)s
+			AND procurement_source_name IN %(parent_names)s
+		"""
+		for dt in PROCUREMENT_DOCTYPES
+		if _table_has_column(dt, "procurement_source_doctype") and _table_has_column(dt, "procurement_source_name")
+	]
+	# Payment Requests created before procurement_source fields were added, or
+	# via the standard ERPNext flow, only carry reference_doctype/reference_name
+	if _table_has_column("Payment Request", "reference_name"):
+		branches.append(
+			"""
+			SELECT 'Payment Request' AS doctype, name, reference_doctype AS parent_doctype,
+				reference_name AS parent_name, 1 AS via_reference, modified
+			FROM `tabPayment Request`
+			WHERE docstatus != 2
+				AND reference_doctype IN %(parent_doctypes)s
+				AND reference_name IN %(parent_names)s
+			"""
+		)
+
+	rows = []
+	if branches:
 		try:
-			child_docs = []
-
-			child_has_proc_src = frappe.get_meta(child_doctype).has_field("procurement_source_doctype")
-			if child_has_proc_src:
-				child_docs = frappe.get_all(
-					child_doctype,
-					filters={
-						"procurement_source_doctype": doctype,
-						"procurement_source_name": docname,
-						"docstatus": ["!=", 2],
-					},
-					fields=["name"],
-				)
+			rows = frappe.db.sql(
+				"{0} ORDER BY modified DESC".format(" UNION ALL ".join(branches)),
+				{
+					"parent_doctypes": tuple({dt for dt, _dn in parents}),
+					"parent_names": tuple({dn for _dt, dn in parents}),
+				},
+				as_dict=True,
+			)
+		except Exception:
+			frappe.log_error(title="Error fetching procurement child documents")
+
+	# {(parent key, child doctype): [names]}, reference-linked Payment Requests
+	# only where none were found through procurement_source_*
+	found = {}
+	by_reference = {}
+	for row in rows:
+		target = by_reference if row.via_reference else found
+		target.setdefault(((row.parent_doctype, row.parent_name), row.doctype), []).append(row.name)
+	for key, names in by_reference.items():
+		found.setdefault(key, names)
+
+	found.update(_get_fallback_forward_children(
+		[dn for dt, dn in parents if dt == "Material Request" and ((dt, dn), "Stock Entry") not in found],
+		[dn for dt, dn in parents if dt == "Payment Request" and ((dt, dn), "Payment Entry") not in found],
+	))
+
+	children = {}
+	for parent in parents:
+		children[parent] = [
+			{"doctype": child_doctype, "name": name}
+			for child_doctype in PROCUREMENT_DOCTYPES
+			for name in found.get((parent, child_doctype), ())
+		]
 
-			# Legacy fallback for Payment Request links
-			if not child_docs and child_doctype == "Payment Request":
-				child_docs = frappe.get_all(
-					"Payment Request",
-					filters={
-						"reference_doctype": doctype,
-						"reference_name": docname,
-						"docstatus": ["!=", 2],
-					},
-					fields=["name"],
-				)
+	return children
 
-			# Stock Entry fallback for Material Request
-			if not child_docs and child_doctype == "Stock Entry" and doctype == "Material Request":
-				se_mr_field = "se.material_request" if _table_has_column("tabStock Entry", "material_request") else "NULL"
-				se_mr_no_field = "se.material_request_no" if _table_has_column("tabStock Entry", "material_request_no") else "NULL"
-				rows = frappe.db.sql(
-					f"""
-					SELECT DISTINCT se.name
-					FROM `tabStock Entry` se
-					INNER JOIN `tabStock Entry Detail` sed ON sed.parent = se.name
-					LEFT JOIN `tabMaterial Request Item` mri ON mri.name = sed.material_request_item
-					WHERE se.docstatus != 2
-						AND (
-							sed.material_request = %(mr)s
-							OR mri.parent = %(mr)s
-							OR {se_mr_field} = %(mr)s
-							OR {se_mr_no_field} = %(mr)s
-						)
-					""",
-					{"mr": docname},
-					as_dict=True,
-				)
-				parent_names = [r.get("name") for r in (rows or []) if r.get("name")]
-				if parent_names:
-					child_docs = frappe.get_all(
-						"Stock Entry",
-						filters={
-							"name": ["in", parent_names],
-							"docstatus": ["!=", 2],
-						},
-						fields=["name"],
-					)
 
-			# Payment Entry fallback via Payment Request
-			if not child_docs and child_doctype == "Payment Entry" and doctype == "Payment Request":
-				child_docs = frappe.get_all(
-					"Payment Entry",
-					filters={
-						"reference_no": docname,
-						"docstatus": ["!=", 2],
-					},
-					fields=["name"],
-				)
+def _get_fallback_forward_children(material_requests, payment_requests):
+	"""
+	Children linked without procurement_source_*, for a whole tree level:
+	Stock Entries referencing the given Material Requests and Payment Entries
+	made from the given Payment Requests. At most three queries however many
+	parents there are.
+
+	Returns {((parent_doctype, parent_name), child_doctype): [names]}.
+	"""
+	found = {}
 
-				if not child_docs:
-					ref_rows = frappe.get_all(
-						"Payment Entry Reference",
-						filters={
-							"reference_doctype": "Payment Request",
-							"reference_name": docname,
-							"docstatus": ["!=", 2],
-						},
-						fields=["parent"],
+	# Stock Entry fallback for Material Request
+	if material_requests:
+		try:
+			se_mr_field = "se.material_request" if _table_has_column("tabStock Entry", "material_request") else "NULL"
+			se_mr_no_field = "se.material_request_no" if _table_has_column("tabStock Entry", "material_request_no") else "NULL"
+			rows = frappe.db.sql(
+				f"""
+				SELECT DISTINCT se.name, se.modified, sed.material_request, mri.parent,
+					{se_mr_field} AS se_material_request, {se_mr_no_field} AS se_material_request_no
+				FROM `tabStock Entry` se
+				INNER JOIN `tabStock Entry Detail` sed ON sed.parent = se.name
+				LEFT JOIN `tabMaterial Request Item` mri ON mri.name = sed.material_request_item
+				WHERE se.docstatus != 2
+					AND (
+						sed.material_request IN %(mrs)s
+						OR mri.parent IN %(mrs)s
+						OR {se_mr_field} IN %(mrs)s
+						OR {se_mr_no_field} IN %(mrs)s
 					)
-					if ref_rows:
-						pe_names = list(set(r.parent for r in ref_rows))
-						child_docs = frappe.get_all(
-							"Payment Entry",
-							filters={
-								"name": ["in", pe_names],
-								"docstatus": ["!=", 2],
-							},
-							fields=["name"],
-						)
+				ORDER BY se.modified DESC
+				""",
+				{"mrs": tuple(material_requests)},
+			)
+			wanted = set(material_requests)
+			for se_name, _modified, *mr_refs in rows:
+				for mr in wanted.intersection(mr_refs):
+					names = found.setdefault((("Material Request", mr), "Stock Entry"), [])
+					if se_name not in names:
+						names.append(se_name)
+		except Exception:
+			pass
 
-			for row in child_docs:
-				direct_children.append({"doctype": child_doctype, "name": row.name})
+	# Payment Entry fallback via Payment Request: reference_no first, then the
+	# Payment Entry Reference table for requests still without one
+	if payment_requests:
+		try:
+			for pe_name, pr_name in frappe.get_all(
+				"Payment Entry",
+				filters={
+					"reference_no": ["in", payment_requests],
+					"docstatus": ["!=", 2],
+				},
+				fields=["name", "reference_no"],
+				as_list=True,
+			):
+				found.setdefault((("Payment Request", pr_name), "Payment Entry"), []).append(pe_name)
 
+			remaining = tuple(
+				pr for pr in payment_requests if (("Payment Request", pr), "Payment Entry") not in found
+			)
+			if remaining:
+				for pe_name, pr_name in frappe.db.sql(
+					"""
+					SELECT DISTINCT pe.name, per.reference_name
+					FROM `tabPayment Entry Reference` per
+					INNER JOIN `tabPayment Entry` pe ON pe.name = per.parent
+					WHERE per.reference_doctype = 'Payment Request'
+						AND per.reference_name IN %(prs)s
+						AND per.docstatus != 2
+						AND pe.docstatus != 2
+					""",
+					{"prs": remaining},
+				):
+					found.setdefault((("Payment Request", pr_name), "Payment Entry"), []).append(pe_name)
 		except Exception:
 			pass
 
-	return direct_children
+	return found
+
+
+def _get_descendant_graph(doctype, docname):
+	"""
+	Direct children of every document below ``doctype``/``docname``, fetched one
+	tree level per query. Returns {(doctype, name): [{"doctype": ..., "name": ...}, ...]}.
+	"""
+	children_map = {}
+	frontier = [(doctype, docname)]
+	while frontier:
+		level = _get_forward_children(frontier)
+		children_map.update(level)
+		frontier = list(dict.fromkeys(
+			(child["doctype"], child["name"])
+			for direct_children in level.values()
+			for child in direct_children
+			if (child["doctype"], child["name"]) not in children_map
+		))
+	return children_map
+
 
+def build_complete_tree(
+	nodes_list, doctype, docname, current_path, processed, target_dt, target_name,
+	children_map=None, node_values=None
+):
+	"""
+	Recursively build the complete document tree with current path marked.
+	Children are read from ``children_map`` (see _get_descendant_graph) and node
+	fields from ``node_values`` (see _get_flow_node_values); both are fetched
+	once for the whole tree when not given.
+	"""
+	if children_map is None:
+		children_map = _get_descendant_graph(doctype, docname)
+	if node_values is None:
+		node_values = _get_flow_node_values(children_map)
 
-def build_complete_tree(nodes_list, doctype, docname, current_path, processed, target_dt, target_name):
-	"""Recursively build the complete document tree with current path marked."""
 	doc_key = f"{doctype}::{docname}"
 	
 	if doc_key in processed:
@@ -2097,7 +2475,7 @@ def build_complete_tree(nodes_list, doctype, docname, current_path, processed, t
 	is_current = (doctype == target_dt and docname == target_name)
 	
 	# Build node for current document
-	node = build_flow_node(doctype, docname, is_current)
+	node = build_flow_node(doctype, docname, is_current, values=node_values.get((doctype, docname)))
 	if not node:
 		return
 	
@@ -2107,7 +2485,7 @@ def build_complete_tree(nodes_list, doctype, docname, current_path, processed, t
 	
 	# Get immediate forward documents (children)
 	try:
-		direct_children = get_direct_forward_documents(doctype, docname)
+		direct_children = children_map.get((doctype, docname)) or []
 
 		for child in direct_children:
 			dt = child["doctype"]
@@ -2115,7 +2493,10 @@ def build_complete_tree(nodes_list, doctype, docname, current_path, processed, t
 			child_key = f"{dt}::{doc_name}"
 			if child_key not in processed:
 				child_nodes = []
-				build_complete_tree(child_nodes, dt, doc_name, current_path, processed, target_dt, target_name)
+				build_complete_tree(
+					child_nodes, dt, doc_name, current_path, processed, target_dt, target_name,
+					children_map=children_map, node_values=node_values
+				)
 				if child_nodes:
 					node["children"].extend(child_nodes)
 	except Exception as e:
@@ -2124,21 +2505,59 @@ def build_complete_tree(nodes_list, doctype, docname, current_path, processed, t
 	nodes_list.append(node)
 
 
-def build_flow_node(doctype, docname, is_current=False):
+def _get_flow_node_fields(doctype):
+	"""Columns build_flow_node reads for a doctype."""
+	meta = frappe.get_meta(doctype)
+	fields = ["name", "docstatus"]
+	fields += [fieldname for fieldname in ("status", "workflow_state") if meta.has_field(fieldname)]
+	return fields + _get_parent_link_fields(doctype)
+
+
+def _get_flow_node_values(nodes):
+	"""
+	Fields needed by build_flow_node for many documents, one query per doctype.
+	Returns {(doctype, name): row}; documents that no longer exist are left out.
+	"""
+	names_by_doctype = {}
+	for doctype, name in nodes:
+		names_by_doctype.setdefault(doctype, []).append(name)
+
+	values = {}
+	for doctype, names in names_by_doctype.items():
+		try:
+			rows = frappe.get_all(
+				doctype,
+				filters={"name": ["in", names]},
+				fields=_get_flow_node_fields(doctype),
+			)
+		except Exception:
+			frappe.log_error(title=f"Error reading flow nodes - {doctype}")
+			continue
+		for row in rows:
+			values[(doctype, row.name)] = row
+	return values
+
+
+def build_flow_node(doctype, docname, is_current=False, values=None):
 	"""
 	Build a flow node with document details and status.
+	``values`` is the document's row from _get_flow_node_values; it is read
+	here when not given.
 	"""
 	try:
-		doc = frappe.get_doc(doctype, docname)
-		source_doctype, source_name = _resolve_parent_link(doc, doctype)
+		if values is None:
+			values = frappe.db.get_value(doctype, docname, _get_flow_node_fields(doctype), as_dict=True)
+		if not values:
+			raise frappe.DoesNotExistError(f"{doctype} {docname} not found")
+		source_doctype, source_name = _resolve_parent_link(values, doctype)
 		
 		node = {
 			"doctype": doctype,
 			"name": docname,
 			"is_current": is_current,
-			"is_submitted": doc.docstatus == 1,
-			"status": doc.get("status") or ("Submitted" if doc.docstatus == 1 else "Draft"),
-			"workflow_state": doc.get("workflow_state"),
+			"is_submitted": values.docstatus == 1,
+			"status": values.get("status") or ("Submitted" if values.docstatus == 1 else "Draft"),
+			"workflow_state": values.get("workflow_state"),
 			"source_doctype": source_doctype,
 			"source_name": source_name,
 			"branches": []
@@ -2182,38 +2601,42 @@ def get_procurement_analysis(doctype, docname):
 		total_source_qty = sum(item.qty or 0 for item in source_items)
 		analysis["total_quantity"] = total_source_qty
 		
-		# Get all child documents across all types
+		# Count child documents across all types in one aggregate query
+		count_queries = [
+			f"""
+			SELECT COUNT(*) AS children
+			FROM `tab{child_doctype}`
+			WHERE procurement_source_doctype = %(doctype)s
+				AND procurement_source_name = %(docname)s
+				AND docstatus != 2
+			"""
+			for child_doctype in PROCUREMENT_DOCTYPES
+			if _has_procurement_source_fields(child_doctype)
+		]
 		total_children = 0
-		for child_doctype in PROCUREMENT_DOCTYPES:
-			try:
-				children = frappe.get_all(
-					child_doctype,
-					filters={
-						"procurement_source_doctype": doctype,
-						"procurement_source_name": docname,
-						"docstatus": ["!=", 2]
-					},
-					fields=["name"]
-				)
-				total_children += len(children)
-			except:
-				pass
+		if count_queries:
+			total_children = frappe.db.sql(
+				"SELECT SUM(children) FROM ({0}) child_counts".format(" UNION ALL ".join(count_queries)),
+				{"doctype": doctype, "docname": docname}
+			)[0][0]
 		
-		analysis["total_children"] = total_children
+		analysis["total_children"] = int(total_children or 0)
 		
 		# Calculate item-wise breakdown
 		items_breakdown = []
 		total_consumed = 0
 		
+		# Consumed quantity per item across all child doctypes, summed once for
+		# every source item
+		consumed_by_item = {}
+		for child_doctype in PROCUREMENT_DOCTYPES:
+			for item_code, qty in get_consumed_quantities(doctype, docname, child_doctype).items():
+				consumed_by_item[item_code] = consumed_by_item.get(item_code, 0) + qty
+		
 		for source_item in source_items:
 			item_code = source_item.item_code
 			source_qty = source_item.qty or 0
-			
-			# Get consumed quantity across all child doctypes
-			consumed_qty = 0
-			for child_doctype in PROCUREMENT_DOCTYPES:
-				consumed = get_consumed_quantities(doctype, docname, child_doctype)
-				consumed_qty += consumed.get(item_code, 0)
+			consumed_qty = consumed_by_item.get(item_code, 0)
 			
 			available_qty = source_qty - consumed_qty
 			total_consumed += consumed_qty
@@ -2462,11 +2885,28 @@ def _set_reference_fields(target_doc, source_doctype, source_name, source_doc):
 		target_doc.append("references", ref_row)
 
 
+def _find_procurement_doctype(docname):
+	"""
+	Return the first doctype in PROCUREMENT_DOCTYPES that has a document named
+	``docname``, checking all of them in one query. None if there is none.
+	"""
+	branches = [
+		f"SELECT {i} AS position, {frappe.db.escape(doctype)} AS doctype FROM `tab{doctype}` WHERE name = %(name)s"
+		for i, doctype in enumerate(PROCUREMENT_DOCTYPES)
+	]
+	rows = frappe.db.sql(
+		"{0} ORDER BY position LIMIT 1".format(" UNION ALL ".join(branches)),
+		{"name": docname}
+	)
+	return rows[0][1] if rows else None
+
+
 @frappe.whitelist()
-def make_procurement_document(source_name, target_doctype=None, **kwargs):
+def make_procurement_document(source_name, target_doctype=None, source_doctype=None, **kwargs):
 	"""
 	Create a new procurement document from a source document.
 	This is called when user clicks 'Create' button.
+	``source_doctype`` is optional; it is looked up from the name when not given.
 	
 	UPDATED: Enhanced to ensure ALL items are copied from source.
 	Supports non-items doctypes (e.g., Payment Entry) via reference fields.
@@ -2485,13 +2925,10 @@ def make_procurement_document(source_name, target_doctype=None, **kwargs):
 			source_name, kwargs, frappe.form_dict
 		))
 	
-	# Determine source doctype from document name
-	# In Frappe, we need to find which doctype this document belongs to
-	source_doctype = None
-	for doctype in PROCUREMENT_DOCTYPES:
-		if frappe.db.exists(doctype, source_name):
-			source_doctype = doctype
-			break
+	# Use the source doctype passed by the caller when it is a procurement
+	# doctype holding this document; otherwise find it from the document name
+	if not (source_doctype in PROCUREMENT_DOCTYPES and frappe.db.exists(source_doctype, source_name)):
+		source_doctype = _find_procurement_doctype(source_name)
 	
 	if not source_doctype:
 		frappe.throw(_("Source document not found"))
@@ -2667,6 +3104,36 @@ def make_procurement_document(source_name, target_doctype=None, **kwargs):
 		)
 		frappe.logger().info(f"Stock Entry parallel consumption: {stock_entry_consumed}")
 	
+	# Material Request Item names by item_code for Stock Entry from Purchase
+	# Requisition, loaded on first use (first row wins, as the previous scan did)
+	mr_item_names_by_code = None
+	
+	# Resolve the target child table fields once instead of per item
+	child_meta_doctype = f"{target_doctype} Item"
+	if target_doctype == "Stock Entry":
+		child_meta_doctype = "Stock Entry Detail"
+	child_fields = {df.fieldname for df in frappe.get_meta(child_meta_doctype).fields}
+	
+	# Copy optional fields that commonly exist in the target child table
+	optional_fields = [
+		field
+		for field in (
+			'item_name', 'description', 'rate', 'warehouse', 'schedule_date',
+			'project', 'cost_center', 'conversion_factor', 'stock_uom', 'stock_qty',
+			'image', 'item_group', 'brand', 'manufacturer', 'manufacturer_part_no'
+		)
+		if field in child_fields
+	]
+	
+	if target_doctype == "Stock Entry":
+		from_wh = source_doc.get("set_from_warehouse") or source_doc.get("from_warehouse")
+		to_wh = source_doc.get("set_warehouse") or source_doc.get("to_warehouse")
+		
+		# Set header-level material_request if field exists
+		if (source_doctype == "Material Request"
+			and target_doc.meta.has_field("material_request") and not target_doc.get("material_request")):
+			target_doc.material_request = source_name
+	
 	for source_item in source_items:
 		if target_doctype == "Stock Entry":
 			item_code = source_item.item_code
@@ -2677,12 +3144,16 @@ def make_procurement_document(source_name, target_doctype=None, **kwargs):
 			
 			# Skip items with no available quantity (already consumed by parallel steps)
 			if available_qty <= 0:
-				frappe.logger().info(f"Skipping {item_code}: no available qty (consumed: {consumed_qty}, source: {source_qty})")
+				frappe.logger("next_custom_app").debug(
+					"Skipping %s: no available qty (consumed: %s, source: %s)", item_code, consumed_qty, source_qty
+				)
 				continue
 			
 			# Use available quantity (respects parallel step consumption)
 			adjusted_qty = min(source_qty, available_qty)
-			frappe.logger().info(f"Adding {item_code}: adjusted_qty={adjusted_qty} (available: {available_qty})")
+			frappe.logger("next_custom_app").debug(
+				"Adding %s: adjusted_qty=%s (available: %s)", item_code, adjusted_qty, available_qty
+			)
 		else:
 			adjusted_qty = source_item.qty
 
@@ -2692,54 +3163,40 @@ def make_procurement_document(source_name, target_doctype=None, **kwargs):
 			"uom": source_item.uom,
 		}
 
-		# Get child table meta for target
-		child_meta_doctype = f"{target_doctype} Item"
-		if target_doctype == "Stock Entry":
-			child_meta_doctype = "Stock Entry Detail"
-		child_meta = frappe.get_meta(child_meta_doctype)
-
 		# Preserve ERPNext buying chain references so downstream status updates
 		# (received/billed) work correctly.
 		if target_doctype == "Purchase Receipt" and source_doctype == "Purchase Order":
-			if child_meta.has_field("purchase_order"):
+			if "purchase_order" in child_fields:
 				target_item["purchase_order"] = source_name
-			if child_meta.has_field("purchase_order_item") and getattr(source_item, "name", None):
+			if "purchase_order_item" in child_fields and getattr(source_item, "name", None):
 				target_item["purchase_order_item"] = source_item.name
 
 		if target_doctype == "Purchase Invoice":
 			# PR -> PI (preferred flow)
 			if source_doctype == "Purchase Receipt":
-				if child_meta.has_field("purchase_receipt"):
+				if "purchase_receipt" in child_fields:
 					target_item["purchase_receipt"] = source_name
-				if child_meta.has_field("pr_detail") and getattr(source_item, "name", None):
+				if "pr_detail" in child_fields and getattr(source_item, "name", None):
 					target_item["pr_detail"] = source_item.name
 
 				# Carry PO references from PR Item if available.
-				if child_meta.has_field("purchase_order") and getattr(source_item, "purchase_order", None):
+				if "purchase_order" in child_fields and getattr(source_item, "purchase_order", None):
 					target_item["purchase_order"] = source_item.purchase_order
-				if child_meta.has_field("po_detail") and getattr(source_item, "purchase_order_item", None):
+				if "po_detail" in child_fields and getattr(source_item, "purchase_order_item", None):
 					target_item["po_detail"] = source_item.purchase_order_item
 
 			# PO -> PI (fallback flow)
 			elif source_doctype == "Purchase Order":
-				if child_meta.has_field("purchase_order"):
+				if "purchase_order" in child_fields:
 					target_item["purchase_order"] = source_name
-				if child_meta.has_field("po_detail") and getattr(source_item, "name", None):
+				if "po_detail" in child_fields and getattr(source_item, "name", None):
 					target_item["po_detail"] = source_item.name
 		
-		# Copy optional fields that commonly exist
-		optional_fields = [
-			'item_name', 'description', 'rate', 'warehouse', 'schedule_date',
-			'project', 'cost_center', 'conversion_factor', 'stock_uom', 'stock_qty',
-			'image', 'item_group', 'brand', 'manufacturer', 'manufacturer_part_no'
-		]
-		
 		for field in optional_fields:
-			if hasattr(source_item, field):
-				value = getattr(source_item, field)
-				# Only set if target child table has this field and value is not None
-				if child_meta and child_meta.has_field(field) and value is not None:
-					target_item[field] = value
+			value = source_item.get(field)
+			# Only set if value is not None
+			if value is not None:
+				target_item[field] = value
 		
 		# Set defaults if not copied
 		if 'description' not in target_item or not target_item.get('description'):
@@ -2754,23 +3211,17 @@ def make_procurement_document(source_name, target_doctype=None, **kwargs):
 		# Stock Entry item warehouses and Material Request references
 		# CRITICAL: Must set material_request_item to pass ERPNext's validate_with_material_request()
 		if target_doctype == "Stock Entry":
-			from_wh = source_doc.get("set_from_warehouse") or source_doc.get("from_warehouse")
-			to_wh = source_doc.get("set_warehouse") or source_doc.get("to_warehouse")
-			if from_wh and child_meta.has_field("s_warehouse"):
+			if from_wh and "s_warehouse" in child_fields:
 				target_item["s_warehouse"] = from_wh
-			if to_wh and child_meta.has_field("t_warehouse"):
+			if to_wh and "t_warehouse" in child_fields:
 				target_item["t_warehouse"] = to_wh
 			
 			# Set Material Request references to satisfy ERPNext validation
 			if source_doctype == "Material Request":
-				# Set header-level material_request if field exists
-				if target_doc.meta.has_field("material_request") and not target_doc.get("material_request"):
-					target_doc.material_request = source_name
-				
 				# Set item-level references
-				if child_meta.has_field("material_request"):
+				if "material_request" in child_fields:
 					target_item["material_request"] = source_name
-				if child_meta.has_field("material_request_item") and getattr(source_item, "name", None):
+				if "material_request_item" in child_fields and getattr(source_item, "name", None):
 					target_item["material_request_item"] = source_item.name
 			
 			# For Purchase Requisition source, try to find the Material Request
@@ -2779,13 +3230,16 @@ def make_procurement_document(source_name, target_doctype=None, **kwargs):
 					mr_name = source_doc.get("procurement_source_name")
 					if mr_name:
 						# Try to find matching Material Request Item for this item
-						mr_doc = frappe.get_doc("Material Request", mr_name)
-						mr_item = next((mi for mi in mr_doc.items if mi.item_code == source_item.item_code), None)
-						if mr_item:
-							if child_meta.has_field("material_request"):
+						if mr_item_names_by_code is None:
+							mr_item_names_by_code = {}
+							for mi in _get_item_rows("Material Request", mr_name, fields=("name", "item_code")):
+								mr_item_names_by_code.setdefault(mi.item_code, mi.name)
+						mr_item_name = mr_item_names_by_code.get(source_item.item_code)
+						if mr_item_name:
+							if "material_request" in child_fields:
 								target_item["material_request"] = mr_name
-							if child_meta.has_field("material_request_item"):
-								target_item["material_request_item"] = mr_item.name
+							if "material_request_item" in child_fields:
+								target_item["material_request_item"] = mr_item_name
 		
 		# Append to target document
 		target_doc.append(target_items_field, target_item)
@@ -2854,13 +3308,18 @@ def get_rfq_pivot_data(rfq_name):
 				"description": item.description
 			})
 		
-		# Collect suppliers
+		# Collect suppliers, reading all supplier names in one query
+		supplier_names = dict(frappe.get_all(
+			"Supplier",
+			filters={"name": ["in", [supplier.supplier for supplier in rfq.suppliers]]},
+			fields=["name", "supplier_name"],
+			as_list=True
+		)) if rfq.suppliers else {}
 		suppliers = []
 		for supplier in rfq.suppliers:
-			supplier_doc = frappe.get_doc("Supplier", supplier.supplier)
 			suppliers.append({
 				"supplier": supplier.supplier,
-				"supplier_name": supplier_doc.supplier_name or supplier.supplier
+				"supplier_name": supplier_names.get(supplier.supplier) or supplier.supplier
 			})
 		
 		return {
@@ -2958,18 +3417,32 @@ def create_supplier_quotations_from_pivot(rfq_name, pivot_data, selected_currenc
 		skipped_suppliers = []
 		errors = []
 		
+		# Index RFQ items once for all suppliers (first row wins, as the previous scan did)
+		rfq_items_by_code = {}
+		for rfq_item in rfq.items:
+			rfq_items_by_code.setdefault(rfq_item.item_code, rfq_item)
+		
+		# Default price lists of all suppliers in one query; the fallback price
+		# list is looked up at most once, for the first supplier without one
+		default_price_lists = dict(frappe.get_all(
+			"Supplier",
+			filters={"name": ["in", list(pivot_data)]},
+			fields=["name", "default_price_list"],
+			as_list=True
+		)) if pivot_data else {}
+		fallback_price_list = None
+		
 		# Process each supplier
 		for supplier, items_data in pivot_data.items():
 			try:
-				supplier_default_price_list = frappe.db.get_value("Supplier", supplier, "default_price_list")
-				price_list_currency = None
-				if supplier_default_price_list:
-					price_list_currency = frappe.db.get_value("Price List", supplier_default_price_list, "currency")
-
 				# Manual Supplier Quotation form accepts non-company currency even when
 				# buying_price_list currency differs (ERPNext handles via conversion rates).
 				# Keep pivot behavior aligned with form behavior.
-				resolved_buying_price_list = supplier_default_price_list or _find_any_enabled_buying_price_list()
+				resolved_buying_price_list = default_price_lists.get(supplier)
+				if not resolved_buying_price_list:
+					if fallback_price_list is None:
+						fallback_price_list = _find_any_enabled_buying_price_list() or ""
+					resolved_buying_price_list = fallback_price_list
 
 				# Filter items that have prices entered
 				items_with_prices = []
@@ -2980,7 +3453,7 @@ def create_supplier_quotations_from_pivot(rfq_name, pivot_data, selected_currenc
 					# Only include items with rate > 0
 					if rate and rate > 0:
 						# Get original item details from RFQ
-						rfq_item = next((i for i in rfq.items if i.item_code == item_code), None)
+						rfq_item = rfq_items_by_code.get(item_code)
 						if rfq_item:
 							items_with_prices.append({
 								"item_code": item_code,
@@ -2989,7 +3462,7 @@ def create_supplier_quotations_from_pivot(rfq_name, pivot_data, selected_currenc
 								"rate": rate,
 								"uom": rfq_item.uom,
 								"description": rfq_item.description,
-								"warehouse": rfq_item.warehouse if hasattr(rfq_item, 'warehouse') else None,
+								"warehouse": rfq_item.get("warehouse"),
 								"schedule_date": rfq.schedule_date or frappe.utils.add_days(frappe.utils.today(), 7)
 							})
 				
@@ -3090,12 +3563,34 @@ def submit_supplier_quotations(sq_names):
 		submitted = []
 		errors = []
 		
+		# Check every name in one query so missing or already processed
+		# quotations are reported without loading them
+		sq_names = list(dict.fromkeys(sq_names))
+		docstatus_by_name = dict(frappe.get_all(
+			"Supplier Quotation",
+			filters={"name": ["in", sq_names]},
+			fields=["name", "docstatus"],
+			as_list=True
+		)) if sq_names else {}
+		
 		for sq_name in sq_names:
+			docstatus = docstatus_by_name.get(sq_name)
+			if docstatus is None:
+				errors.append(f"Error submitting {sq_name}: Supplier Quotation not found")
+				continue
+			if docstatus != 0:
+				errors.append(f"Error submitting {sq_name}: document is already {'submitted' if docstatus == 1 else 'cancelled'}")
+				continue
+			
+			# All quotations are committed together at the end; a savepoint per
+			# document keeps a failed submit from leaving partial writes behind
+			frappe.db.savepoint("submit_supplier_quotation")
 			try:
 				sq = frappe.get_doc("Supplier Quotation", sq_name)
 				sq.submit()
 				submitted.append(sq_name)
 			except Exception as e:
+				frappe.db.rollback(save_point="submit_supplier_quotation")
 				error_msg = f"Error submitting {sq_name}: {str(e)}"
 				errors.append(error_msg)
 				frappe.log_error(
@@ -3161,13 +3656,17 @@ def validate_procurement_document(doc, method=None):
 	Main validation hook for procurement documents.
 	This is called during the validate event.
 	CRITICAL: This function must BLOCK document save if validation fails.
-	Only runs when a Procurement Flow is active.
+	Only runs for doctypes that have a step in the active Procurement Flow.
 	"""
-	# Skip all procurement validations when no flow is active
-	active_flow = get_active_flow()
-	if not active_flow:
+	# Skip all procurement validations when no flow is active or the doctype
+	# is not one of its steps
+	if doc.doctype not in _get_active_flow_step_doctypes():
 		return
 
+	# This document's own items may be changing, so drop any rows memoized
+	# while it served as the source of another document in this request
+	_forget_source_doc(doc.doctype, doc.name)
+
 	try:
 		# For Stock Entry, run emergency validation first
 		if doc.doctype == "Stock Entry":
@@ -3176,6 +3675,20 @@ def validate_procurement_document(doc, method=None):
 		normalize_procurement_source(doc)
 		normalize_buying_chain_references(doc)
 		validate_step_order(doc)
+
+		# The source validators read only the source rows/fields they need;
+		# Stock Entry alignment loads the (memoized) source document itself.
+		# Check once that the source exists so a bad link fails clearly
+		# rather than as "item not in source".
+		if (
+			doc.get("procurement_source_doctype")
+			and doc.get("procurement_source_name")
+			and not frappe.db.exists(doc.procurement_source_doctype, doc.procurement_source_name)
+		):
+			raise frappe.DoesNotExistError(
+				_("{0} {1} not found").format(_(doc.procurement_source_doctype), doc.procurement_source_name)
+			)
+
 		validate_quantity_limits(doc)
 		validate_items_against_source(doc)
 		validate_stock_entry_source_alignment(doc)
@@ -3191,7 +3704,10 @@ def validate_procurement_document(doc, method=None):
 							_("CRITICAL: Stock Entry validation failed - source document is required but missing."),
 							title="Validation Failed"
 						)
-	except Exception as e:
+	except frappe.ValidationError:
+		# frappe.throw already surfaces these to the user; no traceback needed
+		raise
+	except Exception:
 		frappe.log_error(
 			title=f"Procurement Workflow Validation Error - {doc.doctype} {doc.name}",
 			message=frappe.get_traceback()
@@ -3215,6 +3731,8 @@ def on_procurement_submit(doc, method=None):
 				doc.doctype,
 				doc.name
 			)
+	except frappe.ValidationError:
+		raise
 	except Exception as e:
 		# Log error but don't block the submission if it's just a link creation issue
 		frappe.log_error(
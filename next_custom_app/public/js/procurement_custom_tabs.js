@@ -746,6 +746,7 @@ if (!window.next_custom_app.__procurement_tabs_cache
                     method: "next_custom_app.next_custom_app.utils.procurement_workflow.make_procurement_document",
                     args: {
                         source_name: frm.docname,
+                        source_doctype: frm.doctype,
                         target_doctype: next_doctype
                     },
                     callback: function (r) {
@@ -231,6 +231,7 @@ frappe.ready(function () {
 									method: "next_custom_app.next_custom_app.utils.procurement_workflow.make_procurement_document",
 									args: {
 										source_name: frm.docname,
+										source_doctype: frm.doctype,
 										target_doctype: next_doctype
 									},
 									callback: function (r) {
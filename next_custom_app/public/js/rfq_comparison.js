@@ -345,6 +345,7 @@ function award_supplier(frm, supplier, award_type, comparison_data, dialog, sele
 				method: 'next_custom_app.next_custom_app.utils.procurement_workflow.make_procurement_document',
 				args: {
 					source_name: sq_name,
+					source_doctype: 'Supplier Quotation',
 					target_doctype: 'Purchase Order'
 				},
 				callback: function (r) {